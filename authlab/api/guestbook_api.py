@@ -18,9 +18,11 @@ def api_guestbook_list():
     limit = core.parse_int(request.args.get("limit"), default=20, min_v=1, max_v=100)
     offset = core.parse_int(request.args.get("offset"), default=0, min_v=0, max_v=10_000)
 
+    # Version first: a write landing while the body is built then only
+    # makes the ETag older than the body, never the other way round.
+    version = core.GUESTBOOK.version
     total = len(core.GUESTBOOK)
-    msgs = list(reversed(core.GUESTBOOK))  # newest first, как в HTML
-    items = msgs[offset: offset + limit]
+    items = [m.to_dict() for m in core.GUESTBOOK.newest(limit, offset)]  # newest first, как в HTML
 
     payload = {
         "items": items,
@@ -33,7 +35,36 @@ def api_guestbook_list():
         user, True, "api_guestbook", "list",
         route=request.path, meta={"count": len(items), "total": total},
     )
-    return core.json_ok(payload)
+    etag = core.make_etag("guestbook", version, offset, limit)
+    return core.json_ok(payload, etag=etag)
+
+
+@api_bp.get("/guestbook/messages/<int:msg_id>")
+def api_guestbook_detail(msg_id: int):
+    """
+    Return a single guestbook message by id (the create endpoint's Location).
+    Unknown ids (and messages evicted from the in-memory store) get the
+    standard JSON 404.
+    """
+    user, resp = core.require_auth_json()
+    if resp:
+        return resp
+
+    rec = core.GUESTBOOK.get(msg_id)
+    if rec is None:
+        core.log_attempt(
+            user, True, "api_guestbook", "detail_404",
+            route=request.path, meta={"msg_id": msg_id},
+        )
+        return core.api_error("not_found")
+
+    core.log_attempt(
+        user, True, "api_guestbook", "detail_ok",
+        route=request.path, meta={"msg_id": msg_id},
+    )
+    # Messages are immutable; ts tells a reused id (memory store restart) apart.
+    etag = core.make_etag("guestbook_msg", rec.id, rec.ts)
+    return core.json_ok(rec.to_dict(), etag=etag)
 
 
 @api_bp.post("/guestbook/messages")
@@ -82,14 +113,7 @@ def api_guestbook_create():
     if len(message) > core.MAX_MSG_LEN:
         message = message[: core.MAX_MSG_LEN]
 
-    rec = {
-        "ts": core.now_utc_iso(),
-        "user": user,
-        "message": message,
-        "id": core.NEXT_MSG_ID,
-    }
-    core.GUESTBOOK.append(rec)
-    core.NEXT_MSG_ID += 1
+    rec = core.GUESTBOOK.append(core.now_utc_iso(), user, message).to_dict()
 
     core.log_attempt(
         user, True, "api_guestbook", "created",
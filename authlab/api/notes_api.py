@@ -1,6 +1,5 @@
 # authlab/api/notes_api.py
 
-import sqlite3
 from urllib.parse import urlencode
 
 from flask import request
@@ -9,26 +8,41 @@ import authlab.core as core
 from . import api_bp
 
 
+SORT_COLS = {"id": "id", "title": "title"}
+
+
 @api_bp.get("/notes")
 def api_notes():
     """
     Return only the current user's notes with:
-    - offset-based pagination,
+    - offset-based pagination, or keyset pagination via opaque `cursor`,
     - whitelist sort (id|title),
     - RFC 5988 Link header (prev/next).
+
+    With `ids=1,2,3` it becomes a multi-get instead (see _notes_batch).
     """
     user, resp = core.require_auth_json()
     if resp:
         return resp
 
+    ids_raw = request.args.get("ids")
+    if ids_raw is not None:
+        return _notes_batch(user, ids_raw)
+
+    limit = core.parse_int(
+        request.args.get("limit"), default=20, min_v=1, max_v=100
+    )
+    # The owner-scoped COUNT is an indexed lookup, so only page size is charged.
+    cost = core.list_cost(limit)
+
     rate_key = f"{core.API_NOTES_BUCKET}:{core.client_ip()}|{user.lower()}"
     allowed, retry_after = core.rl_check_and_hit(
-        rate_key, core.WINDOW_SEC, core.MAX_ATTEMPTS
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_NOTES_BUCKET), cost=cost
     )
     if not allowed:
         core.log_attempt(
             user, True, "api_notes", "ratelimited",
-            route=request.path, meta={"retry_after": retry_after},
+            route=request.path, meta={"retry_after": retry_after, "cost": cost},
         )
         err = core.api_error("ratelimited")
         err.headers["Retry-After"] = str(retry_after)
@@ -36,70 +50,98 @@ def api_notes():
 
     owner = user.lower()
 
-    limit = core.parse_int(
-        request.args.get("limit"), default=20, min_v=1, max_v=100
-    )
     offset = core.parse_int(
         request.args.get("offset"), default=0, min_v=0, max_v=10_000
     )
 
-    cols = {"id": "id", "title": "title"}
-    dirs = {"asc": "ASC", "desc": "DESC"}
-
-    sort_by_raw = (request.args.get("sort_by") or "title").lower()
-    sort_dir_raw = (request.args.get("sort_dir") or "asc").lower()
-
-    sort_col = cols.get(sort_by_raw)
-    if not sort_col:
-        return core.api_error("invalid_sort_by")
+    sort_by_raw, sort_dir_raw, sort_col, sort_dir, err = core.parse_sort(SORT_COLS, "title")
+    if err:
+        return core.api_error(err)
 
-    sort_dir = dirs.get(sort_dir_raw)
-    if not sort_dir:
-        return core.api_error("invalid_sort_dir")
+    after = None
+    cursor_raw = request.args.get("cursor")
+    if cursor_raw:
+        after = core.decode_cursor(cursor_raw, sort_by_raw, sort_dir_raw)
+        if after is None:
+            return core.api_error("invalid_cursor")
 
     order_sql = f" ORDER BY {sort_col} {sort_dir}, id ASC"
     where_sql = " WHERE owner = ?"
     where_params = (owner,)
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    etag = core.make_etag(
+        "notes", core.db_table_version("notes"), owner, sort_by_raw, sort_dir_raw, limit,
+        offset if after is None else after,
+    )
 
-        count_sql = "SELECT COUNT(*) AS c FROM notes" + where_sql + ";"
-        cur.execute(count_sql, where_params)
-        row_count = cur.fetchone()
-        total = int(row_count["c"]) if row_count else 0
+    # None in COUNT_MODE=has_more: probe one extra row instead of counting.
+    total = core.db_count(conn, "notes", where_sql, where_params, owner=owner)
 
+    if after is None:
         page_sql = (
             "SELECT id, title FROM notes"
             + where_sql
             + order_sql
             + " LIMIT ? OFFSET ?;"
         )
-        page_params = where_params + (limit, offset)
+        probe = limit + 1 if total is None else limit
+        page_params = where_params + (probe, offset)
         cur.execute(page_sql, page_params)
         items = [dict(r) for r in cur.fetchall()]
+        if total is None:
+            has_more = len(items) > limit
+            items = items[:limit]
+        else:
+            has_more = offset + limit < total
+    else:
+        seek_sql, seek_params = core.keyset_where(sort_col, sort_dir, *after)
+        page_sql = (
+            "SELECT id, title FROM notes"
+            + where_sql
+            + " AND "
+            + seek_sql
+            + order_sql
+            + " LIMIT ?;"
+        )
+        cur.execute(page_sql, where_params + tuple(seek_params) + (limit + 1,))
+        items = [dict(r) for r in cur.fetchall()]
+        has_more = len(items) > limit
+        items = items[:limit]
 
-        qp = {
-            "limit": limit,
-            "sort_by": sort_by_raw,
-            "sort_dir": sort_dir_raw,
-        }
-        links = []
-        if offset > 0:
-            prev_qp = dict(qp)
-            prev_qp["offset"] = max(0, offset - limit)
-            prev_url = f"/api/v1/notes?{urlencode(prev_qp)}"
-            links.append(f'<{prev_url}>; rel="prev"')
-        if offset + limit < total:
-            next_qp = dict(qp)
-            next_qp["offset"] = offset + limit
-            next_url = f"/api/v1/notes?{urlencode(next_qp)}"
-            links.append(f'<{next_url}>; rel="next"')
-
-        resp_headers = {}
-        if links:
-            resp_headers["Link"] = ", ".join(links)
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = core.encode_cursor(
+            sort_by_raw, sort_dir_raw, last[sort_col], last["id"]
+        )
+
+    qp = {
+        "limit": limit,
+        "sort_by": sort_by_raw,
+        "sort_dir": sort_dir_raw,
+    }
+    links = []
+    if after is None and offset > 0:
+        prev_qp = dict(qp)
+        prev_qp["offset"] = max(0, offset - limit)
+        prev_url = f"/api/v1/notes?{urlencode(prev_qp)}"
+        links.append(f'<{prev_url}>; rel="prev"')
+    if after is None and has_more and offset + limit <= 10_000:
+        next_qp = dict(qp)
+        next_qp["offset"] = offset + limit
+        next_url = f"/api/v1/notes?{urlencode(next_qp)}"
+        links.append(f'<{next_url}>; rel="next"')
+    elif next_cursor:  # keyset mode, or the next offset would pass the cap
+        next_qp = dict(qp)
+        next_qp["cursor"] = next_cursor
+        next_url = f"/api/v1/notes?{urlencode(next_qp)}"
+        links.append(f'<{next_url}>; rel="next"')
+
+    resp_headers = {}
+    if links:
+        resp_headers["Link"] = ", ".join(links)
 
     core.log_attempt(
         user,
@@ -111,7 +153,8 @@ def api_notes():
             "user": owner,
             "sort": f"{sort_by_raw}:{sort_dir_raw}",
             "limit": limit,
-            "offset": offset,
+            "offset": offset if after is None else None,
+            "cursor": after is not None,
             "count": len(items),
             "total": total,
         },
@@ -122,10 +165,115 @@ def api_notes():
             "items": items,
             "count": len(items),
             "total": total,
-            "offset": offset,
+            "offset": offset if after is None else None,
             "limit": limit,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
         },
         headers=resp_headers,
+        etag=etag,
+    )
+
+
+@api_bp.get("/notes/export")
+def api_notes_export():
+    """
+    Stream all of the current user's notes (id, title, body) as NDJSON.
+
+    Owner-scoped like the list, read through one server-side cursor with
+    fetchmany() (flat memory, no COUNT). Sort as in the list, default id.
+    """
+    user, resp = core.require_auth_json()
+    if resp:
+        return resp
+
+    rate_key = f"{core.API_NOTES_BUCKET}:{core.client_ip()}|{user.lower()}"
+    allowed, retry_after = core.rl_check_and_hit(
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_NOTES_BUCKET),
+        cost=core.RATE_COST_EXPORT,
+    )
+    if not allowed:
+        core.log_attempt(
+            user, True, "api_notes", "ratelimited_export",
+            route=request.path, meta={"retry_after": retry_after},
+        )
+        err = core.api_error("ratelimited")
+        err.headers["Retry-After"] = str(retry_after)
+        return err
+
+    owner = user.lower()
+
+    sort_by_raw, sort_dir_raw, sort_col, sort_dir, err = core.parse_sort(SORT_COLS, "id")
+    if err:
+        return core.api_error(err)
+
+    conn = core.db_conn(readonly=True)
+    cur = conn.execute(
+        "SELECT id, title, body FROM notes WHERE owner = ?"
+        f" ORDER BY {sort_col} {sort_dir}, id ASC;",
+        (owner,),
+    )
+
+    def done(rows):
+        core.log_attempt(
+            user, True, "api_notes", "export",
+            route=request.path,
+            meta={"user": owner, "sort": f"{sort_by_raw}:{sort_dir_raw}", "rows": rows},
+        )
+
+    return core.ndjson_response(cur, on_done=done)
+
+
+def _notes_batch(user, ids_raw):
+    """
+    Fetch up to NOTES_BATCH_MAX owned notes in one query and one rate-limit
+    hit. Missing and foreign ids are masked alike: both are only listed in
+    `not_found`, exactly as api_notes_detail answers 404 for either.
+    """
+    ids = core.parse_id_list(ids_raw, core.NOTES_BATCH_MAX)
+    if ids is None:
+        return core.api_error("invalid_param")
+    if len(ids) > core.NOTES_BATCH_MAX:
+        return core.api_error("too_many_ids", details={"max": core.NOTES_BATCH_MAX})
+
+    cost = core.list_cost(len(ids))
+
+    rate_key = f"{core.API_NOTES_BUCKET}:{core.client_ip()}|{user.lower()}"
+    allowed, retry_after = core.rl_check_and_hit(
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_NOTES_BUCKET), cost=cost
+    )
+    if not allowed:
+        core.log_attempt(
+            user, True, "api_notes", "ratelimited_batch",
+            route=request.path, meta={"retry_after": retry_after, "cost": cost},
+        )
+        err = core.api_error("ratelimited")
+        err.headers["Retry-After"] = str(retry_after)
+        return err
+
+    owner = user.lower()
+
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    etag = core.make_etag("notes_batch", core.db_table_version("notes"), owner, tuple(ids))
+    marks = ",".join("?" * len(ids))
+    cur.execute(
+        f"SELECT id, title, body FROM notes WHERE id IN ({marks}) AND owner = ?;",
+        tuple(ids) + (owner,),
+    )
+    found = {r["id"]: {"id": r["id"], "title": r["title"], "body": r["body"]} for r in cur.fetchall()}
+
+    items = [found[i] for i in ids if i in found]
+    not_found = [i for i in ids if i not in found]
+
+    core.log_attempt(
+        user, True, "api_notes", "batch_ok",
+        route=request.path,
+        meta={"requested": len(ids), "count": len(items), "masked": len(not_found)},
+    )
+    return core.json_ok(
+        {"items": items, "count": len(items), "not_found": not_found},
+        etag=etag,
     )
 
 
@@ -141,7 +289,7 @@ def api_notes_detail(note_id: int):
 
     rate_key = f"{core.API_NOTES_BUCKET}:{core.client_ip()}|{user.lower()}"
     allowed, retry_after = core.rl_check_and_hit(
-        rate_key, core.WINDOW_SEC, core.MAX_ATTEMPTS
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_NOTES_BUCKET)
     )
     if not allowed:
         core.log_attempt(
@@ -154,16 +302,16 @@ def api_notes_detail(note_id: int):
 
     owner = user.lower()
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        query = (
-            "SELECT id, title, body FROM notes "
-            "WHERE id = ? AND owner = ? LIMIT 1;"
-        )
-        params = (note_id, owner)
-        cur.execute(query, params)
-        row = cur.fetchone()
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    etag = core.make_etag("note", core.db_table_version("notes"), owner, note_id)
+    query = (
+        "SELECT id, title, body FROM notes "
+        "WHERE id = ? AND owner = ? LIMIT 1;"
+    )
+    params = (note_id, owner)
+    cur.execute(query, params)
+    row = cur.fetchone()
 
     if not row:
         core.log_attempt(
@@ -177,4 +325,4 @@ def api_notes_detail(note_id: int):
         user, True, "api_notes", "detail_ok",
         route=request.path, meta={"note_id": note_id},
     )
-    return core.json_ok(data)
+    return core.json_ok(data, etag=etag)
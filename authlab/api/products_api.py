@@ -1,6 +1,6 @@
 # authlab/api/products_api.py
 
-import sqlite3
+import math
 from urllib.parse import urlencode
 
 from flask import request
@@ -9,75 +9,54 @@ import authlab.core as core
 from . import api_bp
 
 
-@api_bp.get("/products")
-def api_products_list():
-    """
-    Case-insensitive search, price range filters, whitelisted sort, pagination,
-    and RFC 5988 Link headers.
-    """
-    user, resp = core.require_auth_json()
-    if resp:
-        return resp
-
-    rate_key = f"{core.API_PRODUCTS_BUCKET}:{core.client_ip()}|{user.lower()}"
-    allowed, retry_after = core.rl_check_and_hit(
-        rate_key, core.WINDOW_SEC, core.MAX_ATTEMPTS
-    )
-    if not allowed:
-        core.log_attempt(
-            user, True, "api_products", "ratelimited",
-            route=request.path, meta={"retry_after": retry_after},
-        )
-        err = core.api_error("ratelimited")
-        err.headers["Retry-After"] = str(retry_after)
-        return err
+SORT_COLS = {"id": "id", "name": "name", "price": "price"}
 
-    q = (request.args.get("q") or "").strip()
 
-    min_price_raw = request.args.get("min_price")
-    max_price_raw = request.args.get("max_price")
+def _price_range(min_price_raw, max_price_raw):
+    """Validate min_price/max_price; returns (min_price, max_price, error_code)."""
     min_price = core.parse_float_or_none(min_price_raw)
     max_price = core.parse_float_or_none(max_price_raw)
 
     if (min_price_raw not in (None, "") and min_price is None) or (
         max_price_raw not in (None, "") and max_price is None
     ):
-        return core.api_error("invalid_param")
+        return None, None, "invalid_param"
+
+    # nan/inf parse as floats but match nothing sensible (and bisect
+    # mishandles nan), so treat them as malformed.
+    if any(p is not None and not math.isfinite(p) for p in (min_price, max_price)):
+        return None, None, "invalid_param"
 
     if (
         min_price is not None
         and max_price is not None
         and max_price < min_price
     ):
-        return core.api_error("invalid_range")
+        return None, None, "invalid_range"
 
-    limit = core.parse_int(
-        request.args.get("limit"), default=20, min_v=1, max_v=100
-    )
-    offset = core.parse_int(
-        request.args.get("offset"), default=0, min_v=0, max_v=10_000
-    )
-
-    cols = {"id": "id", "name": "name", "price": "price"}
-    dirs = {"asc": "ASC", "desc": "DESC"}
-
-    sort_by_raw = (request.args.get("sort_by") or "name").lower()
-    sort_dir_raw = (request.args.get("sort_dir") or "asc").lower()
-
-    sort_col = cols.get(sort_by_raw)
-    if not sort_col:
-        return core.api_error("invalid_sort_by")
+    return min_price, max_price, None
 
-    sort_dir = dirs.get(sort_dir_raw)
-    if not sort_dir:
-        return core.api_error("invalid_sort_dir")
-
-    order_sql = f" ORDER BY {sort_col} {sort_dir}, id ASC"
 
+def _filters(conn, q, min_price, max_price):
+    """WHERE parts and params for the name search and price range."""
     where_parts = []
     params = []
 
     if q:
+        if (
+            core.PRODUCTS_SEARCH == "fts"
+            and len(q) >= 3
+            and "%" not in q
+            and "_" not in q
+            and core.db_has_table(conn, "products_fts")
+        ):
+            # Trigram phrase match narrows candidates from the index alone
+            # (a superset: it also folds non-ASCII case); the LIKE below keeps
+            # the exact semantics. Queries with LIKE wildcards skip the index.
+            where_parts.append(
+                "id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)"
+            )
+            params.append('"' + q.replace('"', '""') + '"')
         where_parts.append("name LIKE ? COLLATE NOCASE")
         params.append(f"%{q}%")
 
@@ -89,82 +68,284 @@ def api_products_list():
         where_parts.append("price <= ?")
         params.append(max_price)
 
-    where_sql = (" WHERE " + " AND ".join(where_parts)) if where_parts else ""
+    return where_parts, params
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
 
-        cur.execute(
-            f"SELECT COUNT(*) AS c FROM products{where_sql};", tuple(params)
-        )
-        row = cur.fetchone()
-        total = int(row["c"]) if row else 0
+def _sql_page(conn, q, min_price, max_price, sort_col, sort_dir, limit, offset, after):
+    """One page via SQL: returns (items, total, has_more)."""
+    cur = conn.cursor()
+    order_sql = f" ORDER BY {sort_col} {sort_dir}, id ASC"
+    where_parts, params = _filters(conn, q, min_price, max_price)
+    where_sql = (" WHERE " + " AND ".join(where_parts)) if where_parts else ""
+
+    # None in COUNT_MODE=has_more: probe one extra row instead of counting.
+    total = core.db_count(conn, "products", where_sql, params)
 
+    if after is None:
         page_sql = (
             f"SELECT id, name, price FROM products"
             f"{where_sql}{order_sql} LIMIT ? OFFSET ?;"
         )
-        page_params = tuple(params) + (limit, offset)
+        probe = limit + 1 if total is None else limit
+        page_params = tuple(params) + (probe, offset)
         cur.execute(page_sql, page_params)
         items = [dict(r) for r in cur.fetchall()]
+        if total is None:
+            has_more = len(items) > limit
+            items = items[:limit]
+        else:
+            has_more = offset + limit < total
+    else:
+        seek_sql, seek_params = core.keyset_where(sort_col, sort_dir, *after)
+        page_where = " WHERE " + " AND ".join(where_parts + [seek_sql])
+        page_sql = (
+            f"SELECT id, name, price FROM products"
+            f"{page_where}{order_sql} LIMIT ?;"
+        )
+        cur.execute(page_sql, tuple(params + seek_params) + (limit + 1,))
+        items = [dict(r) for r in cur.fetchall()]
+        has_more = len(items) > limit
+        items = items[:limit]
 
-        qp = {"limit": limit}
-        if q:
-            qp["q"] = q
-        if min_price is not None:
-            qp["min_price"] = min_price
-        if max_price is not None:
-            qp["max_price"] = max_price
-        qp["sort_by"] = sort_by_raw
-        qp["sort_dir"] = sort_dir_raw
-
-        links = []
-        if offset > 0:
-            prev_qp = dict(qp)
-            prev_qp["offset"] = max(0, offset - limit)
-            prev_url = f"/api/v1/products?{urlencode(prev_qp)}"
-            links.append(f'<{prev_url}>; rel="prev"')
-
-        if offset + limit < total:
-            next_qp = dict(qp)
-            next_qp["offset"] = offset + limit
-            next_url = f"/api/v1/products?{urlencode(next_qp)}"
-            links.append(f'<{next_url}>; rel="next"')
-
-        resp_headers = {}
-        if links:
-            resp_headers["Link"] = ", ".join(links)
+    return items, total, has_more
 
-    core.log_attempt(
-        user, True, "sqli_surface", "param_safe",
-        route=request.path, meta={"q": q},
+
+@api_bp.get("/products")
+def api_products_list():
+    """
+    Case-insensitive search, price range filters, whitelisted sort, pagination,
+    and RFC 5988 Link headers.
+
+    Pagination is offset-based by default; passing the opaque `cursor` from a
+    previous page's `next_cursor` switches to keyset pagination (index seek
+    after the last (sort value, id), no offset cap).
+    """
+    user, resp = core.require_auth_json()
+    if resp:
+        return resp
+
+    q = (request.args.get("q") or "").strip()
+
+    min_price_raw = request.args.get("min_price")
+    max_price_raw = request.args.get("max_price")
+
+    limit = core.parse_int(
+        request.args.get("limit"), default=20, min_v=1, max_v=100
     )
-    core.log_attempt(
-        user,
-        True,
-        "api_products",
-        "list",
-        route=request.path,
-        meta={
-            "q": q,
-            "min": min_price,
-            "max": max_price,
-            "sort": f"{sort_by_raw}:{sort_dir_raw}",
-            "limit": limit,
-            "offset": offset,
-            "count": len(items),
-            "total": total,
-        },
+    filtered = bool(q) or min_price_raw not in (None, "") or max_price_raw not in (None, "")
+    cost = core.list_cost(limit, filtered=filtered)
+
+    rate_key = f"{core.API_PRODUCTS_BUCKET}:{core.client_ip()}|{user.lower()}"
+    allowed, retry_after = core.rl_check_and_hit(
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_PRODUCTS_BUCKET), cost=cost
     )
+    if not allowed:
+        core.log_attempt(
+            user, True, "api_products", "ratelimited",
+            route=request.path, meta={"retry_after": retry_after, "cost": cost},
+        )
+        err = core.api_error("ratelimited")
+        err.headers["Retry-After"] = str(retry_after)
+        return err
+
+    min_price, max_price, err = _price_range(min_price_raw, max_price_raw)
+    if err:
+        return core.api_error(err)
+
+    offset = core.parse_int(
+        request.args.get("offset"), default=0, min_v=0, max_v=10_000
+    )
+
+    sort_by_raw, sort_dir_raw, sort_col, sort_dir, err = core.parse_sort(SORT_COLS, "name")
+    if err:
+        return core.api_error(err)
+
+    after = None
+    cursor_raw = request.args.get("cursor")
+    if cursor_raw:
+        after = core.decode_cursor(cursor_raw, sort_by_raw, sort_dir_raw)
+        if after is None:
+            return core.api_error("invalid_cursor")
+
+    conn = core.db_conn(readonly=True)
+
+    # Auth and rate limiting already ran; an identical normalized query at
+    # the same data version replays the encoded page without touching SQL.
+    cache_key = (
+        q, min_price, max_price, sort_by_raw, sort_dir_raw, limit,
+        offset if after is None else after,
+    )
+    version = core.db_table_version("products")
+    etag = core.make_etag("products", version, cache_key)
+    cached = core.PRODUCTS_CACHE.get(cache_key, version)
+    if cached is not None:
+        body, resp_headers, meta = cached
+        _log_list(user, q, dict(meta, cache="hit"))
+        return core.json_raw(
+            body, headers=dict(resp_headers, **{"X-Cache": "hit"}), etag=etag
+        )
+
+    if core.PRODUCTS_ENGINE == "catalog" and core.PRODUCTS_CATALOG.supports(q, sort_by_raw, after):
+        # Columnar snapshot: exact total for free; hidden in has_more mode
+        # so the response shape does not depend on the engine.
+        core.PRODUCTS_CATALOG.refresh(conn, version)
+        items, total, has_more = core.PRODUCTS_CATALOG.query(
+            q, min_price, max_price, sort_by_raw, sort_dir_raw, limit, offset, after
+        )
+        if core.COUNT_MODE == "has_more":
+            total = None
+    else:
+        items, total, has_more = _sql_page(
+            conn, q, min_price, max_price, sort_col, sort_dir, limit, offset, after
+        )
+
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = core.encode_cursor(
+            sort_by_raw, sort_dir_raw, last[sort_col], last["id"]
+        )
+
+    qp = {"limit": limit}
+    if q:
+        qp["q"] = q
+    if min_price is not None:
+        qp["min_price"] = min_price
+    if max_price is not None:
+        qp["max_price"] = max_price
+    qp["sort_by"] = sort_by_raw
+    qp["sort_dir"] = sort_dir_raw
+
+    links = []
+    if after is None and offset > 0:
+        prev_qp = dict(qp)
+        prev_qp["offset"] = max(0, offset - limit)
+        prev_url = f"/api/v1/products?{urlencode(prev_qp)}"
+        links.append(f'<{prev_url}>; rel="prev"')
+
+    if after is None and has_more and offset + limit <= 10_000:
+        next_qp = dict(qp)
+        next_qp["offset"] = offset + limit
+        next_url = f"/api/v1/products?{urlencode(next_qp)}"
+        links.append(f'<{next_url}>; rel="next"')
+    elif next_cursor:  # keyset mode, or the next offset would pass the cap
+        next_qp = dict(qp)
+        next_qp["cursor"] = next_cursor
+        next_url = f"/api/v1/products?{urlencode(next_qp)}"
+        links.append(f'<{next_url}>; rel="next"')
 
-    return core.json_ok(
+    resp_headers = {}
+    if links:
+        resp_headers["Link"] = ", ".join(links)
+
+    meta = {
+        "q": q,
+        "min": min_price,
+        "max": max_price,
+        "sort": f"{sort_by_raw}:{sort_dir_raw}",
+        "limit": limit,
+        "offset": offset if after is None else None,
+        "cursor": after is not None,
+        "count": len(items),
+        "total": total,
+    }
+
+    resp = core.json_ok(
         {
             "items": items,
             "count": len(items),
             "total": total,
-            "offset": offset,
+            "offset": offset if after is None else None,
             "limit": limit,
+            "has_more": has_more,
+            "next_cursor": next_cursor,
         },
         headers=resp_headers,
+        etag=etag,
+    )
+    if core.PRODUCTS_CACHE.enabled and resp.status_code == 200:
+        meta["cache"] = "miss"
+        resp.headers["X-Cache"] = "miss"
+        core.PRODUCTS_CACHE.put(cache_key, version, resp.get_data(), resp_headers, meta)
+
+    _log_list(user, q, meta)
+    return resp
+
+
+def _log_list(user, q, meta):
+    core.log_attempt(
+        user, True, "sqli_surface", "param_safe",
+        route=request.path, meta={"q": q},
     )
+    core.log_attempt(
+        user, True, "api_products", "list",
+        route=request.path, meta=meta,
+    )
+
+
+@api_bp.get("/products/export")
+def api_products_export():
+    """
+    Stream the whole (filtered) catalog as NDJSON, one product per line.
+
+    Same auth, filters (q, min_price, max_price) and sort as the list
+    endpoint, but no pagination: rows come from one server-side cursor via
+    fetchmany(), so memory stays flat and no COUNT runs. Default order is
+    id (a plain rowid scan); other sorts may need a temporary sort in SQLite.
+    """
+    user, resp = core.require_auth_json()
+    if resp:
+        return resp
+
+    rate_key = f"{core.API_PRODUCTS_BUCKET}:{core.client_ip()}|{user.lower()}"
+    allowed, retry_after = core.rl_check_and_hit(
+        rate_key, core.WINDOW_SEC, core.rate_budget(core.API_PRODUCTS_BUCKET),
+        cost=core.RATE_COST_EXPORT,
+    )
+    if not allowed:
+        core.log_attempt(
+            user, True, "api_products", "ratelimited_export",
+            route=request.path, meta={"retry_after": retry_after},
+        )
+        err = core.api_error("ratelimited")
+        err.headers["Retry-After"] = str(retry_after)
+        return err
+
+    q = (request.args.get("q") or "").strip()
+    min_price, max_price, err = _price_range(
+        request.args.get("min_price"), request.args.get("max_price")
+    )
+    if err:
+        return core.api_error(err)
+
+    sort_by_raw, sort_dir_raw, sort_col, sort_dir, err = core.parse_sort(SORT_COLS, "id")
+    if err:
+        return core.api_error(err)
+
+    conn = core.db_conn(readonly=True)
+    where_parts, params = _filters(conn, q, min_price, max_price)
+    where_sql = (" WHERE " + " AND ".join(where_parts)) if where_parts else ""
+    cur = conn.execute(
+        f"SELECT id, name, price FROM products{where_sql}"
+        f" ORDER BY {sort_col} {sort_dir}, id ASC;",
+        params,
+    )
+
+    core.log_attempt(
+        user, True, "sqli_surface", "param_safe",
+        route=request.path, meta={"q": q},
+    )
+    meta = {
+        "q": q,
+        "min": min_price,
+        "max": max_price,
+        "sort": f"{sort_by_raw}:{sort_dir_raw}",
+    }
+
+    def done(rows):
+        core.log_attempt(
+            user, True, "api_products", "export",
+            route=request.path, meta=dict(meta, rows=rows),
+        )
+
+    return core.ndjson_response(cur, on_done=done)
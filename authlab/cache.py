@@ -0,0 +1,93 @@
+# authlab/cache.py
+
+"""
+Byte-bounded LRU cache for pre-encoded API responses.
+
+Entries hold the exact response body bytes plus the headers and log meta
+needed to replay them, and are tagged with the data version they were
+built from (core.db_table_version of the source table). The first lookup
+that sees a newer version drops every entry, so a cached page is never
+served after the underlying tables changed.
+"""
+
+import threading
+from collections import OrderedDict
+
+ENTRY_OVERHEAD = 256  # rough per-entry cost of the key, tuples and dict slot
+
+
+class ResponseCache:
+    """
+    LRU over (key -> body, headers, meta), evicting by total byte size.
+
+    max_bytes=0 disables the cache (get always returns None, put is a no-op).
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max(0, int(max_bytes))
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+        self.size = 0
+        self._data = OrderedDict()   # key -> (body, headers, meta, nbytes)
+        self._version = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def info(self):
+        """Counters plus current occupancy."""
+        with self._lock:
+            return dict(self.stats, entries=len(self._data), bytes=self.size,
+                        max_bytes=self.max_bytes)
+
+    def get(self, key, version):
+        """Return (body, headers, meta) for key at data version, or None."""
+        if not self.max_bytes:
+            return None
+        with self._lock:
+            if version != self._version:
+                if self._data:
+                    self.stats["invalidations"] += 1
+                self._data.clear()
+                self.size = 0
+                self._version = version
+            item = self._data.get(key)
+            if item is None:
+                self.stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats["hits"] += 1
+            return item[0], item[1], item[2]
+
+    def put(self, key, version, body, headers=None, meta=None):
+        """
+        Store a response built from data version. Entries built from a
+        version older than the cache's current one are discarded.
+        """
+        headers = headers or {}
+        nbytes = len(body) + sum(len(k) + len(v) for k, v in headers.items()) + ENTRY_OVERHEAD
+        if nbytes > self.max_bytes:
+            return False
+        with self._lock:
+            if version != self._version:
+                return False
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= old[3]
+            while self._data and self.size + nbytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= evicted[3]
+                self.stats["evictions"] += 1
+            self._data[key] = (body, headers, meta, nbytes)
+            self.size += nbytes
+        return True
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+            self.size = 0
@@ -0,0 +1,240 @@
+# authlab/catalog.py
+
+"""
+In-process columnar copy of the products table.
+
+The table is small and read-mostly, so list queries can be answered from
+column arrays instead of SQL:
+
+    ids, prices      array('q') / array('d')   (numpy arrays when available)
+    names, folded    lists of str; folded = ASCII-lowercased like LIKE NOCASE
+    perms            presorted row permutations per (sort_by, sort_dir),
+                     each in "ORDER BY col dir, id ASC" order
+    ranks            inverse permutations: a row's position in each perm
+
+A price range is a bisect on the price-sorted permutation (sorted by
+price it is a direct slice), the name filter is one str.find scan over
+all folded names, and matches are put in page order by their rank in the
+requested permutation. numpy is optional: with it, columns are ndarrays
+and ordering is a vectorized argsort; without it the same steps run over
+array.array.
+
+Results are identical to the SQLite path (same LIKE/NOCASE semantics,
+same sort order and keyset rules) for finite price bounds. Queries
+containing LIKE wildcards (% or _) and cursors with a sort value of the
+wrong type are not supported and must go to SQL (see supports()).
+"""
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # pure-Python fallback
+    np = None
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+
+def fold(s):
+    """ASCII-only lowercase: the case folding SQLite's LIKE applies."""
+    return s.translate(_ASCII_LOWER)
+
+
+class ProductCatalog:
+    """
+    Columnar products snapshot tagged with the products table version it was
+    loaded at; refresh(conn, version) reloads when the version moved.
+    """
+
+    def __init__(self, use_numpy=True):
+        self.use_numpy = use_numpy and np is not None
+        self.version = None
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._cols = None
+
+    def __len__(self):
+        return len(self._cols["ids"]) if self._cols else 0
+
+    def supports(self, q, sort_by=None, after=None):
+        """
+        False for queries that need SQL: LIKE wildcards in q, or a cursor
+        whose sort value is not of the column's type (SQLite orders mixed
+        types by storage class; Python refuses to compare them).
+        """
+        if "%" in q or "_" in q:
+            return False
+        if after is not None and sort_by != "id":
+            want = str if sort_by == "name" else (int, float)
+            return isinstance(after[0], want)
+        return True
+
+    def refresh(self, conn, version):
+        """Reload from conn unless the snapshot is already at version."""
+        if self.version == version and self._cols is not None:
+            return
+        with self._lock:
+            if self.version == version and self._cols is not None:
+                return
+            self._cols = self._load(conn)
+            self.version = version
+            self.loads += 1
+
+    def _load(self, conn):
+        rows = conn.execute("SELECT id, name, price FROM products ORDER BY id;").fetchall()
+        ids = array("q", (r[0] for r in rows))
+        names = [r[1] for r in rows]
+        prices = array("d", (r[2] for r in rows))
+        n = len(rows)
+
+        # Rows are in id order, so a row's position breaks ties as id ASC.
+        by_id = range(n)
+        perms = {
+            ("id", "asc"): array("l", by_id),
+            ("id", "desc"): array("l", reversed(by_id)),
+            ("name", "asc"): array("l", sorted(by_id, key=names.__getitem__)),
+            # reverse=True keeps equal names in id ASC order (sort is stable)
+            ("name", "desc"): array("l", sorted(by_id, key=names.__getitem__, reverse=True)),
+            ("price", "asc"): array("l", sorted(by_id, key=prices.__getitem__)),
+            ("price", "desc"): array("l", sorted(by_id, key=prices.__getitem__, reverse=True)),
+        }
+        ranks = {}
+        for k, perm in perms.items():
+            rank = array("l", bytes(perm.itemsize * n))
+            for pos, row in enumerate(perm):
+                rank[row] = pos
+            ranks[k] = rank
+
+        # Folded names joined by newlines; starts[i] is row i's offset
+        # (plus a sentinel at the end) so a match offset maps back to a row.
+        folded = [fold(s) for s in names]
+        starts = array("q", [0])
+        for s in folded:
+            starts.append(starts[-1] + len(s) + 1)
+
+        price_perm = perms[("price", "asc")]
+        cols = {
+            "ids": ids,
+            "names": names,
+            "folded": folded,
+            "blob": "\n".join(folded) + "\n",
+            "starts": starts,
+            "prices": prices,
+            "perms": perms,
+            "ranks": ranks,
+            "sorted_prices": array("d", (prices[i] for i in price_perm)),
+        }
+        if self.use_numpy:
+            as_np = lambda a: np.frombuffer(a, dtype=np.dtype(f"{a.typecode == 'd' and 'f' or 'i'}{a.itemsize}"))
+            cols["ids"] = as_np(ids)
+            cols["prices"] = as_np(prices)
+            cols["perms"] = {k: as_np(v) for k, v in perms.items()}
+            cols["ranks"] = {k: as_np(v) for k, v in ranks.items()}
+        return cols
+
+    def query(self, q, min_price, max_price, sort_by, sort_dir, limit, offset=0, after=None):
+        """
+        Answer one list request: returns (items, total, has_more) with
+        items as {id, name, price} dicts, total = all matches.
+        after=(value, last_id) selects the keyset page instead of offset.
+        """
+        c = self._cols
+        key = (sort_by, sort_dir)
+        perm = c["perms"][key]
+        ranged = min_price is not None or max_price is not None
+
+        if not q and not ranged:
+            order = perm
+        elif not q and sort_by == "price":
+            # The price range is one contiguous run of the price permutation.
+            lo, hi = self._price_span(c, min_price, max_price)
+            n = len(perm)
+            order = perm[lo:hi] if sort_dir == "asc" else perm[n - hi:n - lo]
+        else:
+            order = self._ordered(c, self._matches(c, q, min_price, max_price), key)
+        total = len(order)
+
+        start = offset if after is None else self._seek(c, order, sort_by, sort_dir, *after)
+        page = order[start:start + limit]
+        ids, names, prices = c["ids"], c["names"], c["prices"]
+        items = [
+            {"id": int(ids[i]), "name": names[i], "price": float(prices[i])}
+            for i in page
+        ]
+        return items, total, start + limit < total
+
+    def _price_span(self, c, min_price, max_price):
+        """[lo, hi) of the price range in the price-ascending permutation."""
+        sp = c["sorted_prices"]
+        lo = 0 if min_price is None else bisect_left(sp, min_price)
+        hi = len(sp) if max_price is None else bisect_right(sp, max_price)
+        return lo, max(lo, hi)
+
+    def _matches(self, c, q, min_price, max_price):
+        """Rows matching the name search and/or price range (any order)."""
+        if not q:
+            lo, hi = self._price_span(c, min_price, max_price)
+            return c["perms"][("price", "asc")][lo:hi]
+        rows = self._search(c, fold(q))
+        if min_price is not None or max_price is not None:
+            prices = c["prices"]
+            lo = float("-inf") if min_price is None else min_price
+            hi = float("inf") if max_price is None else max_price
+            rows = [i for i in rows if lo <= prices[i] <= hi]
+        return rows
+
+    def _search(self, c, needle):
+        """
+        Rows whose folded name contains needle. Selective needles hop from
+        match to match with str.find over all names joined by newlines;
+        when blob.count() says a large share of rows match, one pass over
+        the name list is cheaper than a hop per match.
+        """
+        blob, starts = c["blob"], c["starts"]
+        if "\n" in needle or blob.count(needle) > len(starts) // 16:
+            return [i for i, s in enumerate(c["folded"]) if needle in s]
+        find = blob.find
+        rows = []
+        pos = find(needle)
+        while pos != -1:
+            row = bisect_right(starts, pos) - 1
+            rows.append(row)
+            pos = find(needle, starts[row + 1])
+        return rows
+
+    def _ordered(self, c, rows, key):
+        """rows in (sort_by, sort_dir) order, by their rank in that permutation."""
+        rank = c["ranks"][key]
+        if self.use_numpy:
+            rows = np.asarray(rows, dtype=np.int64)
+            return rows[np.argsort(rank[rows], kind="stable")]
+        return sorted(rows, key=rank.__getitem__)
+
+    def _seek(self, c, order, sort_by, sort_dir, value, last_id):
+        """
+        Position of the first row after (value, last_id) in order; same
+        rule as core.keyset_where. Binary search over the monotone
+        predicate "row sorts at or before the cursor".
+        """
+        ids = c["ids"]
+        col = {"id": ids, "name": c["names"], "price": c["prices"]}[sort_by]
+
+        def at_or_before(i):
+            rid = ids[i]
+            if sort_by == "id":
+                return rid <= last_id if sort_dir == "asc" else rid >= last_id
+            v = col[i]
+            if sort_dir == "asc":
+                return (v, rid) <= (value, last_id)
+            return v > value or (v == value and rid <= last_id)
+
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if at_or_before(order[mid]):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
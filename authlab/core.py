@@ -2,11 +2,30 @@
 
 import os
 import json
+import math
 import time
+import base64
+import hashlib
+import queue
+import atexit
+import random
+import sqlite3
 import secrets
+import tempfile
+import threading
 from datetime import datetime
+from pathlib import Path
+from collections import OrderedDict
 
-from flask import (request, session, jsonify)
+from flask import (request, session, jsonify, current_app, stream_with_context)
+
+from authlab.cache import ResponseCache
+from authlab.catalog import ProductCatalog
+from authlab.guestbook import Guestbook, SqliteGuestbook
+from authlab.logs import SegmentedLog
+from authlab.mfa import TotpGuard
+from authlab.pwverify import PasswordVerifier
+from authlab.ratelimit import ALGORITHMS, MemoryRateStore, SqliteRateStore
 
 # --- .env autoload (dev convenience) ---
 try:
@@ -37,6 +56,8 @@ API_ERRORS = {
     "invalid_range": ("Invalid range", 400),
     "invalid_sort_by": ("Invalid sort_by", 400),
     "invalid_sort_dir": ("Invalid sort_dir", 400),
+    "invalid_cursor": ("Invalid cursor", 400),
+    "too_many_ids": ("Too many ids", 400),
     # + for global handlers:
     "not_found": ("Resource not found", 404),
     "method_not_allowed": ("Method not allowed", 405),
@@ -45,13 +66,44 @@ API_ERRORS = {
 
 API_PRODUCTS_BUCKET = os.getenv("API_PRODUCTS_BUCKET", "api_products")
 API_NOTES_BUCKET = os.getenv("API_NOTES_BUCKET", "api_notes")
+NOTES_BATCH_MAX = 100   # ids per GET /api/v1/notes?ids=...
 
 # --- Rate-Limit config (fixed-window) ---
 
 WINDOW_SEC  = int(os.getenv("WINDOW_SEC", 10))
 MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", 2))
 RATE_BUCKET = os.getenv("RATE_BUCKET", "default")
-RATE_STATE  = {}  # rate_key - {"start": int, "count": int}
+RATE_MAX_KEYS = int(os.getenv("RATE_MAX_KEYS", 100_000))
+RATE_BACKEND = os.getenv("RATE_BACKEND", "memory").lower()   # memory | sqlite (shared by workers)
+RATE_DB_PATH = os.getenv("RATE_DB_PATH") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "authlab_rate.db"
+)
+
+# Limiter algorithm per bucket (rate_key prefix before ":"): fixed | sliding | gcra,
+# e.g. RATE_ALGOS=api_products=gcra,api_notes=sliding. Unlisted buckets use RATE_ALGO.
+RATE_ALGO  = os.getenv("RATE_ALGO", "fixed").lower()
+RATE_ALGOS = {
+    k.strip(): v.strip().lower()
+    for k, _, v in (p.partition("=") for p in os.getenv("RATE_ALGOS", "").split(","))
+    if k.strip() and v.strip()
+}
+
+# Per-bucket token budgets per window (default MAX_ATTEMPTS), e.g. RATE_BUDGETS=api_products=40.
+RATE_BUDGETS = {
+    k.strip(): int(v)
+    for k, _, v in (p.partition("=") for p in os.getenv("RATE_BUDGETS", "").split(","))
+    if k.strip() and v.strip()
+}
+# List endpoints cost 1 + limit // RATE_COST_ROWS tokens (0 = flat cost of 1),
+# plus RATE_COST_FILTER when the request runs a filtered COUNT.
+RATE_COST_ROWS   = int(os.getenv("RATE_COST_ROWS", 0))
+RATE_COST_FILTER = int(os.getenv("RATE_COST_FILTER", 0))
+RATE_COST_EXPORT = int(os.getenv("RATE_COST_EXPORT", 1))   # tokens per NDJSON export
+
+if RATE_BACKEND == "sqlite":
+    RATE_STATE = SqliteRateStore(RATE_DB_PATH, max_entries=RATE_MAX_KEYS)
+else:
+    RATE_STATE = MemoryRateStore(max_entries=RATE_MAX_KEYS)  # rate_key - (start, count)
 
 # --- MFA config ---
 
@@ -63,6 +115,29 @@ MFA_BUCKET        = os.getenv("MFA_BUCKET", "login_mfa")
 if ADMIN_MFA_ENABLED and not ADMIN_MFA_SECRET:
     raise RuntimeError("ADMIN_MFA_ENABLED=true, but ADMIN_MFA_SECRET is missing")
 
+# Cached per-user TOTP verifiers + accepted (user, step) claims that expire with
+# the window; the claims live in their own store on RATE_BACKEND (with sqlite: a
+# separate mfa_used table in RATE_DB_PATH), so rate-key churn never evicts them.
+MFA_CACHE_MAX = int(os.getenv("MFA_CACHE_MAX", 1024))      # cached verifiers (users)
+MFA_USED_MAX  = int(os.getenv("MFA_USED_MAX", 100_000))    # remembered accepted codes
+
+if RATE_BACKEND == "sqlite":
+    MFA_USED = SqliteRateStore(RATE_DB_PATH, max_entries=MFA_USED_MAX, table="mfa_used")
+else:
+    MFA_USED = MemoryRateStore(max_entries=MFA_USED_MAX)
+MFA_GUARD = TotpGuard(MFA_USED, window=MFA_WINDOW, max_users=MFA_CACHE_MAX)
+
+# --- Password verification (scrypt off the request threads) ---
+
+PW_WORKERS      = int(os.getenv("PW_WORKERS", max(1, (os.cpu_count() or 2) // 2)))  # 0 = inline
+PW_MAX_INFLIGHT = int(os.getenv("PW_MAX_INFLIGHT", 4 * max(1, PW_WORKERS)))  # running + queued
+PW_TIMEOUT_SEC  = float(os.getenv("PW_TIMEOUT_SEC", 10))
+PW_RETRY_AFTER  = int(os.getenv("PW_RETRY_AFTER", 1))   # Retry-After on 503 when full
+
+PW_VERIFIER = PasswordVerifier(
+    PW_WORKERS, PW_MAX_INFLIGHT, timeout=PW_TIMEOUT_SEC, retry_after=PW_RETRY_AFTER
+)
+
 # --- Users (store only hashes) ---
 
 USERS = {
@@ -86,11 +161,196 @@ DEV_MODE = os.getenv("DEV_MODE", "false").lower() == "true"
 if APP_ENV == "prod" and DEV_MODE:
     raise RuntimeError("DEV_MODE must be OFF in production")
 
+# --- Database (pooled per-thread connections) ---
+
+DB_PATH     = os.getenv("DB_PATH") or str(Path(__file__).resolve().parent.parent / "authlab.db")
+DB_CACHE_KB = int(os.getenv("DB_CACHE_KB", 8192))    # page cache per connection
+DB_MMAP_MB  = int(os.getenv("DB_MMAP_MB", 64))       # memory-mapped I/O window
+DB_BUSY_MS  = int(os.getenv("DB_BUSY_MS", 5000))     # wait on locks instead of failing
+
+_DB_LOCAL = threading.local()
+
+def _db_open(readonly):
+    if readonly:
+        conn = sqlite3.connect(Path(DB_PATH).resolve().as_uri() + "?mode=ro", uri=True)
+    else:
+        conn = sqlite3.connect(DB_PATH)
+        conn.execute("PRAGMA journal_mode=WAL;")
+        conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_KB};")
+    conn.execute(f"PRAGMA mmap_size={DB_MMAP_MB * 1024 * 1024};")
+    conn.execute(f"PRAGMA busy_timeout={DB_BUSY_MS};")
+    return conn
+
+def db_conn(readonly=False):
+    """
+    Return this thread's pooled connection to DB_PATH (row_factory=Row).
+
+    Connections are opened once per thread (and per process after fork)
+    with WAL journal mode and tuned cache/mmap/busy_timeout pragmas.
+    readonly=True hands out a separate mode=ro connection for GET handlers.
+    """
+    key = "ro" if readonly else "rw"
+    pid = os.getpid()
+    if getattr(_DB_LOCAL, "pid", None) != pid:
+        _DB_LOCAL.__dict__.clear()
+        _DB_LOCAL.pid = pid
+    conn = getattr(_DB_LOCAL, key, None)
+    if conn is None:
+        if readonly and getattr(_DB_LOCAL, "rw", None) is None:
+            db_conn(readonly=False)  # first rw open switches the file to WAL
+        conn = _db_open(readonly)
+        setattr(_DB_LOCAL, key, conn)
+    return conn
+
+_DB_WATCH = {"pid": None, "conn": None}
+_DB_WATCH_LOCK = threading.Lock()
+
+def db_data_version():
+    """
+    Return a value that changes whenever any connection commits to DB_PATH.
+
+    PRAGMA data_version is per-connection, so it is read through one
+    dedicated read-only watcher connection shared by all threads.
+    """
+    with _DB_WATCH_LOCK:
+        if _DB_WATCH["pid"] != os.getpid():
+            _DB_WATCH["conn"] = sqlite3.connect(
+                Path(DB_PATH).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False
+            )
+            _DB_WATCH["pid"] = os.getpid()
+        return _DB_WATCH["conn"].execute("PRAGMA data_version;").fetchone()[0]
+
+def db_table_version(table):
+    """
+    Return a value that changes whenever `table` (products or notes) changes.
+
+    Reads the trigger-maintained table_versions row (scripts/005_guestbook.sql),
+    so commits to other tables - guestbook write-behind flushes in particular -
+    leave that table's caches and ETags alone. Falls back to the database-wide
+    db_data_version() until the migration is applied.
+    """
+    conn = db_conn(readonly=True)
+    if db_has_table(conn, "table_versions"):
+        row = conn.execute("SELECT v FROM table_versions WHERE tbl = ?;", (table,)).fetchone()
+        if row is not None:
+            return row[0]
+    return ("db", db_data_version())
+
+# Product name search: fts = trigram FTS5 prefilter when products_fts exists, like = plain scan
+PRODUCTS_SEARCH = os.getenv("PRODUCTS_SEARCH", "fts").lower()
+
+# /api/v1/products list engine: sqlite = SQL per request, catalog = in-process columnar
+# snapshot (authlab/catalog.py, numpy if installed), reloaded when products change
+PRODUCTS_ENGINE = os.getenv("PRODUCTS_ENGINE", "sqlite").lower()
+PRODUCTS_CATALOG = ProductCatalog()
+
+# Encoded /api/v1/products pages, invalidated when products change (0 = disabled)
+PRODUCTS_CACHE_MB = float(os.getenv("PRODUCTS_CACHE_MB", 8))
+PRODUCTS_CACHE = ResponseCache(PRODUCTS_CACHE_MB * 1024 * 1024)
+
+# --- List counts (COUNT strategy) ---
+
+COUNT_MODE     = os.getenv("COUNT_MODE", "fast").lower()   # exact | fast | has_more
+COUNT_MEMO_SEC = float(os.getenv("COUNT_MEMO_SEC", 5))     # TTL of memoized filtered counts
+COUNT_MEMO_MAX = int(os.getenv("COUNT_MEMO_MAX", 1024))
+
+_COUNT_MEMO = OrderedDict()   # (table, where_sql, params, table_version) -> (expires, n)
+_COUNT_LOCK = threading.Lock()
+_DB_TABLES  = {}              # DB_PATH -> (schema_version, set of table/view names)
+
+def db_has_table(conn, name):
+    """
+    True if DB_PATH has table/view `name`. The name set is cached and
+    re-read when PRAGMA schema_version moves, so tables added by
+    scripts/migrate.py to a running app are picked up on the next call.
+    """
+    version = conn.execute("PRAGMA schema_version;").fetchone()[0]
+    cached = _DB_TABLES.get(DB_PATH)
+    if cached is None or cached[0] != version:
+        rows = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type IN ('table', 'view');"
+        ).fetchall()
+        cached = _DB_TABLES[DB_PATH] = (version, {r[0] for r in rows})
+    return name in cached[1]
+
+def db_count(conn, table, where_sql="", params=(), owner=None):
+    """
+    Total rows for a list endpoint according to COUNT_MODE.
+
+    - exact:    SELECT COUNT(*) every time (previous behaviour).
+    - fast:     unfiltered and owner-only totals come from the trigger-maintained
+                row_counts table; other filters are memoized for COUNT_MEMO_SEC,
+                keyed by the normalized filter and db_table_version(table), so
+                any insert, update or delete invalidates the memo early.
+    - has_more: returns None; the caller fetches limit+1 rows instead.
+
+    owner marks a where_sql that filters on owner only. Falls back to an
+    exact COUNT when row_counts has not been migrated in.
+    """
+    if COUNT_MODE == "has_more":
+        return None
+
+    def exact():
+        row = conn.execute(f"SELECT COUNT(*) FROM {table}{where_sql};", tuple(params)).fetchone()
+        return int(row[0]) if row else 0
+
+    if COUNT_MODE != "fast" or not db_has_table(conn, "row_counts"):
+        return exact()
+
+    def counter(key_owner):
+        row = conn.execute(
+            "SELECT n FROM row_counts WHERE tbl = ? AND owner = ?;", (table, key_owner)
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    if not where_sql:
+        return counter("")
+    if owner is not None:
+        return counter(owner)
+
+    key = (table, where_sql, tuple(params), db_table_version(table))
+    now = time.monotonic()
+    with _COUNT_LOCK:
+        hit = _COUNT_MEMO.get(key)
+        if hit is not None and hit[0] > now:
+            _COUNT_MEMO.move_to_end(key)
+            return hit[1]
+    n = exact()
+    with _COUNT_LOCK:
+        _COUNT_MEMO[key] = (now + COUNT_MEMO_SEC, n)
+        _COUNT_MEMO.move_to_end(key)
+        while len(_COUNT_MEMO) > COUNT_MEMO_MAX:
+            _COUNT_MEMO.popitem(last=False)
+    return n
+
 # --- Guestbook state (in-memory) ---
 
-GUESTBOOK   = []
-MAX_MSG_LEN = int(os.getenv("MAX_MSG_LEN", 500))
-NEXT_MSG_ID = 1
+GUESTBOOK_STORE    = os.getenv("GUESTBOOK_STORE", "sqlite").lower()  # sqlite | memory
+GUESTBOOK_MAX      = int(os.getenv("GUESTBOOK_MAX", 10_000))        # hot tail / ring buffer size
+GUESTBOOK_FLUSH_MS = float(os.getenv("GUESTBOOK_FLUSH_MS", 5))      # write-behind batch interval
+MAX_MSG_LEN        = int(os.getenv("MAX_MSG_LEN", 500))
+GUESTBOOK_PAGE     = int(os.getenv("GUESTBOOK_PAGE", 50))           # messages per HTML page
+GUESTBOOK_FRAG_MB  = float(os.getenv("GUESTBOOK_FRAG_MB", 4))      # rendered <li> cache, 0 = off
+
+if GUESTBOOK_STORE == "sqlite":
+    # Durable table in DB_PATH shared by all workers; appends are acknowledged
+    # from memory and inserted in batches by a write-behind thread.
+    GUESTBOOK = SqliteGuestbook(DB_PATH, GUESTBOOK_MAX, GUESTBOOK_FLUSH_MS, busy_ms=DB_BUSY_MS)
+else:
+    GUESTBOOK = Guestbook(GUESTBOOK_MAX)
+
+# Rendered HTML per message, keyed (id, XSS_S_STATE). Messages never change,
+# so entries only leave by LRU; the version is the XSS state they were built for.
+GUESTBOOK_FRAGMENTS = ResponseCache(GUESTBOOK_FRAG_MB * 1024 * 1024)
+
+
+@atexit.register
+def guestbook_shutdown():
+    """Write out messages still waiting in the write-behind queue."""
+    if isinstance(GUESTBOOK, SqliteGuestbook):
+        GUESTBOOK.close()
 
 # --- Logs ---
 
@@ -98,6 +358,41 @@ LOG_DIR  = "logs"
 LOG_FILE = os.path.join(LOG_DIR, "authlab.log")
 os.makedirs(LOG_DIR, exist_ok=True)
 
+LOG_MODE         = os.getenv("LOG_MODE", "sync").lower()           # sync | async
+LOG_QUEUE_MAX    = int(os.getenv("LOG_QUEUE_MAX", 10000))          # records
+LOG_BATCH_MAX    = int(os.getenv("LOG_BATCH_MAX", 256))            # records per write
+LOG_FLUSH_SEC    = float(os.getenv("LOG_FLUSH_SEC", 0.5))          # max buffering delay
+LOG_QUEUE_POLICY = os.getenv("LOG_QUEUE_POLICY", "drop").lower()   # drop | block
+LOG_ROTATE_MB    = float(os.getenv("LOG_ROTATE_MB", 50))           # 0 = never roll over
+
+LOG_SINK = SegmentedLog(LOG_FILE, max_bytes=int(LOG_ROTATE_MB * 1024 * 1024))
+
+def _parse_log_rules(raw):
+    """Parse 'result/reason=0.1,result=0.5' (or bare keys) into {key: value}."""
+    rules = {}
+    for part in raw.split(","):
+        key, _, val = part.strip().partition("=")
+        if key:
+            rules[key] = float(val) if val else 1.0
+    return rules
+
+# Log volume policy for routine success records. Keys are "result/reason"
+# or just "result" (all reasons), e.g. LOG_SAMPLE=api_products/list=0.1.
+LOG_SAMPLE        = _parse_log_rules(os.getenv("LOG_SAMPLE", ""))      # key=keep ratio
+LOG_AGGREGATE     = _parse_log_rules(os.getenv("LOG_AGGREGATE", ""))   # keys folded into counters
+LOG_AGGREGATE_SEC = float(os.getenv("LOG_AGGREGATE_SEC", 10))
+
+# Failures and security events are always written in full, whatever the rules say.
+LOG_ALWAYS_RESULTS = frozenset({
+    "invalid", "success", "mfa_required", "logout", "api_error", "api_auth",
+})
+LOG_ALWAYS_REASONS = frozenset({
+    "csrf_bad", "ratelimited", "ratelimited_detail", "ratelimited_batch",
+    "ratelimited_export", "rate_limited",
+    "bad_password", "no_user", "mfa_bad", "bad_json", "empty", "server_error",
+    "detail_masked_404", "blocked_404", "no_owner_check",
+})
+
 def now_utc_iso():
     """Return current UTC time in ISO8601 with Z suffix."""
     return datetime.utcnow().isoformat() + "Z"
@@ -106,8 +401,243 @@ def client_ip():
     """Best-effort client IP from Flask request."""
     return request.remote_addr or "-"
 
+
+class LogWriter:
+    """
+    Background writer for LOG_MODE=async.
+
+    Requests only enqueue records; a daemon thread serializes them and writes
+    batches through one long-lived handle on LOG_SINK. A batch is written when it
+    reaches LOG_BATCH_MAX records or LOG_FLUSH_SEC after the previous write.
+
+    Queue-full policy (LOG_QUEUE_POLICY):
+    - drop:  the record is discarded and counted; the writer appends one
+             {"result": "log_dropped"} record with the count at the next write.
+    - block: the request thread waits for free space (backpressure, no loss).
+
+    A failed write (disk full, rotation error) never stops the thread: the
+    handle is reopened and the batch retried every LOG_FLUSH_SEC, up to
+    RETRIES attempts, after which its records are counted as dropped.
+    `errors` counts failed writes; ensure_running() restarts the thread if
+    it is gone anyway.
+    """
+
+    _STOP = object()
+    RETRIES = 3
+
+    def __init__(self, sink, queue_max, batch_max, flush_sec, policy):
+        self.sink = sink
+        self.batch_max = max(1, batch_max)
+        self.flush_sec = max(0.01, flush_sec)
+        self.block = (policy == "block")
+        self.dropped = 0
+        self.errors = 0
+        self.restarts = 0
+        self._q = queue.Queue(maxsize=max(1, queue_max))
+        self._lock = threading.Lock()
+        self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="authlab-log", daemon=True)
+        self._thread.start()
+
+    def ensure_running(self):
+        """Restart the writer thread (same queue) if it has died."""
+        if self._thread.is_alive():
+            return
+        with self._lock:
+            if not self._thread.is_alive():
+                self.restarts += 1
+                self._start()
+
+    def put(self, rec):
+        """Enqueue one record according to the queue-full policy."""
+        if self.block:
+            self._q.put(rec)
+            return
+        try:
+            self._q.put_nowait(rec)
+        except queue.Full:
+            with self._lock:   # request threads and the writer both update it
+                self.dropped += 1
+
+    def close(self, timeout=5.0):
+        """Flush everything queued so far and stop the writer thread."""
+        if not self._thread.is_alive():
+            return
+        self._q.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        stop = False
+        failures = 0
+        while not stop:
+            deadline = time.monotonic() + self.flush_sec
+            while len(batch) < self.batch_max:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    rec = self._q.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if rec is self._STOP:
+                    stop = True
+                    break
+                batch.append(rec)
+            if self._write(batch):
+                batch.clear()
+                failures = 0
+                continue
+            failures += 1
+            if failures >= self.RETRIES or stop:
+                with self._lock:
+                    self.dropped += len(batch)
+                batch.clear()
+                failures = 0
+            else:
+                time.sleep(self.flush_sec)
+        self._close_sink()
+
+    def _write(self, batch):
+        """Write batch plus a pending log_dropped record; False if the write failed."""
+        with self._lock:
+            dropped = self.dropped
+        recs = batch
+        if dropped:
+            recs = batch + [{
+                "ts": now_utc_iso(), "ip": "-", "username": None,
+                "user_exists": False, "result": "log_dropped", "reason": "queue_full",
+                "route": None, "meta": {"count": dropped},
+            }]
+        if not recs:
+            return True
+        try:
+            self.sink.append(
+                "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in recs),
+                keep_open=True,
+            )
+        except Exception:
+            self.errors += 1
+            self._close_sink()   # reopen on the next attempt
+            return False
+        with self._lock:
+            self.dropped -= dropped
+        return True
+
+    def _close_sink(self):
+        try:
+            self.sink.close()
+        except OSError:
+            pass
+
+
+_LOG_WRITER = None
+_LOG_WRITER_PID = None
+_LOG_WRITER_LOCK = threading.Lock()
+
+def _log_writer():
+    """Lazily start the async writer (once per process, fork-safe)."""
+    global _LOG_WRITER, _LOG_WRITER_PID
+    pid = os.getpid()
+    if _LOG_WRITER is None or _LOG_WRITER_PID != pid:
+        with _LOG_WRITER_LOCK:
+            if _LOG_WRITER is None or _LOG_WRITER_PID != pid:
+                _LOG_WRITER = LogWriter(
+                    LOG_SINK, LOG_QUEUE_MAX, LOG_BATCH_MAX, LOG_FLUSH_SEC, LOG_QUEUE_POLICY
+                )
+                _LOG_WRITER_PID = pid
+    _LOG_WRITER.ensure_running()
+    return _LOG_WRITER
+
+def _log_emit(rec):
+    """Hand one record to the async writer or append it synchronously."""
+    if LOG_MODE == "async":
+        _log_writer().put(rec)
+        return
+    LOG_SINK.append(json.dumps(rec, ensure_ascii=False) + "\n")
+
+
+class LogAggregator:
+    """
+    Per-window counters for records matched by LOG_AGGREGATE.
+
+    Instead of one line per request, each (result, reason, route) seen in a
+    window produces one summary record with meta.count when the window
+    closes. Windows are closed lazily by the next log_attempt call of any
+    kind (or at exit).
+    """
+
+    def __init__(self, window_sec):
+        self.window_sec = max(1.0, window_sec)
+        self.counts = {}
+        self.window_start = time.time()
+        self.window_start_iso = now_utc_iso()
+        self._lock = threading.Lock()
+
+    def hit(self, result, reason, route):
+        """Count one record in the current window."""
+        self.roll()
+        with self._lock:
+            key = (result, reason, route)
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def roll(self, force=False):
+        """Emit summaries for the current window if it has elapsed."""
+        if not force and time.time() < self.window_start + self.window_sec:
+            return
+        with self._lock:
+            if not force and time.time() < self.window_start + self.window_sec:
+                return  # another thread closed it first
+            counts, self.counts = self.counts, {}
+            since = self.window_start_iso
+            self.window_start = time.time()
+            self.window_start_iso = now_utc_iso()
+        for (result, reason, route), n in counts.items():
+            _log_emit({
+                "ts": now_utc_iso(), "ip": "-", "username": None,
+                "user_exists": False, "result": result, "reason": reason,
+                "route": route,
+                "meta": {"summary": True, "count": n, "since": since,
+                         "window_sec": self.window_sec},
+            })
+
+
+LOG_AGGREGATOR = LogAggregator(LOG_AGGREGATE_SEC)
+
+@atexit.register
+def log_shutdown():
+    """Flush counters and pending async log records (registered with atexit)."""
+    LOG_AGGREGATOR.roll(force=True)
+    if _LOG_WRITER is not None and _LOG_WRITER_PID == os.getpid():
+        _LOG_WRITER.close()
+
+def _log_rule(rules, result, reason):
+    rule = rules.get(f"{result}/{reason}")
+    return rules.get(result) if rule is None else rule
+
 def log_attempt(username, user_exists, result, reason, route=None, meta=None):
-    """Append one structured authlab log record to authlab.log."""
+    """
+    Append one structured authlab log record to authlab.log.
+
+    Routine records may be sampled (LOG_SAMPLE) or folded into per-window
+    counters (LOG_AGGREGATE); LOG_ALWAYS_* records are always written.
+    """
+    if LOG_AGGREGATE:
+        LOG_AGGREGATOR.roll()
+    if (LOG_SAMPLE or LOG_AGGREGATE) and not (
+        result in LOG_ALWAYS_RESULTS or reason in LOG_ALWAYS_REASONS
+    ):
+        if _log_rule(LOG_AGGREGATE, result, reason) is not None:
+            LOG_AGGREGATOR.hit(result, reason, route)
+            return
+        rate = _log_rule(LOG_SAMPLE, result, reason)
+        if rate is not None:
+            if random.random() >= rate:
+                return
+            meta = dict(meta or {}, sample_rate=rate)
+
     rec = {
         "ts": now_utc_iso(),
         "ip": client_ip(),
@@ -118,44 +648,157 @@ def log_attempt(username, user_exists, result, reason, route=None, meta=None):
         "route": route,
         "meta": meta,
     }
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    _log_emit(rec)
 
 # --- Rate-limit helper (fixed window) ---
 
-def rl_check_and_hit(rate_key, window_sec, max_attempts, now=None):
+def rl_check_and_hit(rate_key, window_sec, max_attempts, now=None, algo=None, cost=1):
     """
-    Fixed-window rate limit.
+    Rate limit (fixed window by default; see RATE_ALGO / RATE_ALGOS).
 
     Returns (allowed: bool, retry_after_seconds: int).
     If allowed=False - retry_after_seconds >= 1, attempt is NOT counted.
-    If allowed=True  - attempt already counted (count++).
+    If allowed=True  - attempt already counted (count += cost).
     """
+    if algo is None:
+        algo = RATE_ALGOS.get(rate_key.split(":", 1)[0], RATE_ALGO)
     if now is None:
-        now = int(time.time())
+        now = int(time.time()) if algo == "fixed" else time.time()
 
-    state = RATE_STATE.get(rate_key)
-    if state is None or now >= state["start"] + window_sec:
-        state = {"start": now, "count": 0}
-        RATE_STATE[rate_key] = state
+    step = ALGORITHMS[algo](now, window_sec, max_attempts, cost)
+    return RATE_STATE.hit(rate_key, now, step)
 
-    if state["count"] >= max_attempts:
-        retry_after = (state["start"] + window_sec) - now
-        if retry_after < 1:
-            retry_after = 1
-        return False, retry_after
 
-    state["count"] += 1
-    return True, 0
+def rate_budget(bucket):
+    """Tokens per window for a bucket (RATE_BUDGETS, default MAX_ATTEMPTS)."""
+    return RATE_BUDGETS.get(bucket, MAX_ATTEMPTS)
 
 
-def json_ok(data, status=200, headers=None):
-    """Uniform successful JSON response."""
+def list_cost(limit, filtered=False):
+    """Token cost of a list request: grows with page size and filtered COUNTs."""
+    cost = 1
+    if RATE_COST_ROWS > 0:
+        cost += limit // RATE_COST_ROWS
+    if filtered:
+        cost += RATE_COST_FILTER
+    return cost
+
+
+SORT_DIRS = {"asc": "ASC", "desc": "DESC"}
+
+def parse_sort(cols, default_by, default_dir="asc"):
+    """
+    Read sort_by/sort_dir from the query string against a column whitelist.
+    Returns (sort_by_raw, sort_dir_raw, sort_col, sort_dir, error_code).
+    """
+    sort_by_raw = (request.args.get("sort_by") or default_by).lower()
+    sort_dir_raw = (request.args.get("sort_dir") or default_dir).lower()
+    sort_col = cols.get(sort_by_raw)
+    if not sort_col:
+        return sort_by_raw, sort_dir_raw, None, None, "invalid_sort_by"
+    sort_dir = SORT_DIRS.get(sort_dir_raw)
+    if not sort_dir:
+        return sort_by_raw, sort_dir_raw, sort_col, None, "invalid_sort_dir"
+    return sort_by_raw, sort_dir_raw, sort_col, sort_dir, None
+
+
+EXPORT_BATCH = int(os.getenv("EXPORT_BATCH", 500))   # rows per fetchmany() in NDJSON exports
+
+def ndjson_response(cur, on_done=None):
+    """
+    Stream an executed cursor as NDJSON, EXPORT_BATCH rows at a time, so
+    memory stays flat whatever the table size. on_done(rows) runs when the
+    stream ends (also if the client disconnects early).
+    """
+    def generate():
+        rows = 0
+        try:
+            while True:
+                batch = cur.fetchmany(EXPORT_BATCH)
+                if not batch:
+                    break
+                rows += len(batch)
+                yield "".join(
+                    json.dumps(dict(r), ensure_ascii=False, separators=(",", ":")) + "\n"
+                    for r in batch
+                )
+        finally:
+            cur.close()
+            if on_done is not None:
+                on_done(rows)
+
+    return current_app.response_class(
+        stream_with_context(generate()), mimetype="application/x-ndjson"
+    )
+
+
+def make_etag(*parts):
+    """
+    Strong ETag from the values that fully determine a response body
+    (e.g. a data version plus the normalized query), so a match can be
+    answered without building or encoding the body.
+    """
+    return '"' + hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(etag):
+    """True if the request's If-None-Match lists etag (weak comparison) or '*'."""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    tags = {t.strip() for t in header.split(",")}
+    return "*" in tags or etag in tags or ("W/" + etag) in tags
+
+
+def not_modified(etag, headers=None):
+    """Empty 304 response carrying the validator."""
+    resp = current_app.response_class(status=304)
+    resp.headers["ETag"] = etag
+    if headers:
+        for k, v in headers.items():
+            resp.headers[k] = v
+    return resp
+
+
+def _conditional(resp, etag, headers):
+    """Tag a GET 200 with ETag (content hash unless given) and answer 304 on match."""
+    if etag is None:
+        etag = '"' + hashlib.sha256(resp.get_data()).hexdigest()[:32] + '"'
+    if etag_matches(etag):
+        return not_modified(etag, headers)
+    resp.headers["ETag"] = etag
+    return resp
+
+
+def json_ok(data, status=200, headers=None, etag=None):
+    """
+    Uniform successful JSON response.
+
+    GET 200 responses carry a strong ETag and become 304 Not Modified when
+    it matches If-None-Match. Pass etag= (see make_etag) to validate from a
+    version before encoding; otherwise the encoded body is hashed.
+    """
+    conditional = status == 200 and request.method in ("GET", "HEAD")
+    if conditional and etag is not None and etag_matches(etag):
+        return not_modified(etag, headers)
     resp = jsonify(data)
     resp.status_code = status
     if headers:
         for k, v in headers.items():
             resp.headers[k] = v
+    if conditional:
+        return _conditional(resp, etag, headers)
+    return resp
+
+
+def json_raw(body, status=200, headers=None, etag=None):
+    """Successful JSON response from an already-encoded body (cache replay)."""
+    resp = current_app.response_class(body, status=status, mimetype="application/json")
+    if headers:
+        for k, v in headers.items():
+            resp.headers[k] = v
+    if status == 200 and request.method in ("GET", "HEAD"):
+        return _conditional(resp, etag, headers)
     return resp
 
 
@@ -186,6 +829,31 @@ def parse_int(val, default, min_v, max_v):
         return default
     return max(min_v, min(max_v, x))
 
+_SQLITE_INT_MIN, _SQLITE_INT_MAX = -(2 ** 63), 2 ** 63 - 1
+
+def parse_id_list(val, max_n):
+    """
+    Parse '1,2,3' into de-duplicated positive ints in request order.
+    Returns None if malformed, empty or out of SQLite's integer range;
+    stops after max_n + 1 ids so the caller can reject oversized lists
+    by length.
+    """
+    ids = []
+    seen = set()
+    for part in (val or "").split(","):
+        part = part.strip()
+        if not (part.isascii() and part.isdigit()):
+            return None
+        n = int(part)
+        if not 1 <= n <= _SQLITE_INT_MAX:
+            return None
+        if n not in seen:
+            seen.add(n)
+            ids.append(n)
+        if len(ids) > max_n:
+            break
+    return ids or None
+
 def parse_float_or_none(val):
     """Parse float or return None on empty/invalid."""
     if val is None or val == "":
@@ -194,7 +862,47 @@ def parse_float_or_none(val):
         return float(val)
     except (TypeError, ValueError):
         return None
-    
+
+def encode_cursor(sort_by, sort_dir, value, last_id):
+    """Opaque keyset cursor for the last row of a page: (sort value, id)."""
+    raw = json.dumps([sort_by, sort_dir, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _sqlite_int(v):
+    return isinstance(v, int) and not isinstance(v, bool) and _SQLITE_INT_MIN <= v <= _SQLITE_INT_MAX
+
+def decode_cursor(cursor, sort_by, sort_dir):
+    """
+    Decode a keyset cursor into (value, last_id).
+
+    Returns None if the cursor is malformed, was issued for another sort,
+    or holds a number SQLite cannot bind (ints outside 64 bits, NaN/inf).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_by, c_dir, value, last_id = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if c_by != sort_by or c_dir != sort_dir or not _sqlite_int(last_id):
+        return None
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+    elif not (isinstance(value, str) or _sqlite_int(value)):
+        return None
+    return value, last_id
+
+def keyset_where(sort_col, sort_dir, value, last_id):
+    """
+    SQL predicate + params for rows after (value, last_id) in
+    "ORDER BY sort_col sort_dir, id ASC" order.
+    """
+    if sort_col == "id":
+        return ("id > ?" if sort_dir == "ASC" else "id < ?"), [last_id]
+    if sort_dir == "ASC":
+        return f"({sort_col}, id) > (?, ?)", [value, last_id]
+    return f"({sort_col} < ? OR ({sort_col} = ? AND id > ?))", [value, value, last_id]
+
 def require_auth_json():
     """
     Ensure API user is authenticated.
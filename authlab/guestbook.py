@@ -0,0 +1,338 @@
+# authlab/guestbook.py
+
+"""
+Guestbook storage.
+
+Messages live in a fixed-capacity ring buffer of compact __slots__
+records: appending past capacity overwrites the oldest message, reads are
+newest-first slices that touch only the requested records, and an
+id -> record dict gives O(1) lookups for the retained messages.
+
+- Guestbook: the ring buffer alone (per-process, lost on restart).
+- SqliteGuestbook: durable and shared by all workers; the ring buffer is
+  a hot tail over a SQLite table fed by a write-behind thread.
+"""
+
+import os
+import time
+import queue
+import sqlite3
+import threading
+
+
+class Message:
+    """One guestbook entry."""
+
+    __slots__ = ("id", "ts", "user", "message")
+
+    def __init__(self, id, ts, user, message):
+        self.id = id
+        self.ts = ts
+        self.user = user
+        self.message = message
+
+    def to_dict(self):
+        return {"id": self.id, "ts": self.ts, "user": self.user, "message": self.message}
+
+
+class Guestbook:
+    """
+    Ring buffer holding the newest `capacity` messages.
+
+    next_id only grows, so it doubles as a version of the whole guestbook
+    (every append changes it, evictions only happen on append). It
+    restarts at 1 with the process, so version also carries the creation
+    time and pid, which tell a restarted or forked buffer apart.
+
+    Id assignment and the slot write happen under one lock, so concurrent
+    appends get distinct ids and land in id order; reads take the same
+    lock for a consistent head/length (get is a single dict lookup).
+    """
+
+    def __init__(self, capacity=10_000):
+        self.capacity = max(1, capacity)
+        self.next_id = 1
+        self._buf = [None] * self.capacity
+        self._head = 0       # slot of the next append
+        self._len = 0
+        self._by_id = {}     # id -> Message
+        self._lock = threading.Lock()
+        self._born = time.time_ns()
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def version(self):
+        """Changes whenever the contents change, and never repeats across restarts."""
+        return (self._born, os.getpid(), self.next_id)
+
+    def append(self, ts, user, message):
+        """Store a new message (evicting the oldest when full) and return it."""
+        with self._lock:
+            rec = Message(self.next_id, ts, user, message)
+            self.next_id = rec.id + 1
+            self._put(rec)
+        return rec
+
+    def put(self, rec):
+        """Push an already-built record as the newest entry."""
+        with self._lock:
+            self._put(rec)
+
+    def _put(self, rec):
+        old = self._buf[self._head]
+        if old is not None:
+            del self._by_id[old.id]
+        self._buf[self._head] = rec
+        self._by_id[rec.id] = rec
+        self._head = (self._head + 1) % self.capacity
+        self._len = min(self._len + 1, self.capacity)
+
+    def get(self, msg_id):
+        """Message by id, or None if unknown or already evicted."""
+        return self._by_id.get(msg_id)
+
+    def newest(self, limit, offset=0):
+        """Up to limit messages, newest first, skipping the offset newest."""
+        with self._lock:
+            buf, cap, last = self._buf, self.capacity, self._head - 1
+            end = min(self._len, offset + limit)
+            return [buf[(last - k) % cap] for k in range(offset, end)]
+
+
+class SqliteGuestbook:
+    """
+    Guestbook persisted in a SQLite table shared by every worker (schema:
+    scripts/005_guestbook.sql).
+
+    Writes are write-behind: append() takes the next id, parks the message
+    in this process's pending list and returns at once; a daemon thread
+    inserts pending messages in one transaction per batch every flush_ms
+    and drops them from the pending list after the commit. Failed batches
+    are retried, never dropped.
+
+    Ids are reserved in blocks of id_block from the guestbook_ids row, so
+    workers never collide and the id is known before the row is written.
+    Rows also get a seq (rowid) in commit order, which orders the
+    guestbook; rows are never deleted, so the newest seq is the row count.
+
+    Reads: the ring buffer mirrors the newest `capacity` rows and is
+    topped up with one indexed "seq > last_seq" query per read; this
+    process's unflushed messages are listed in front of it, and pages past
+    the ring are read from the table.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path, capacity=10_000, flush_ms=5, id_block=64, busy_ms=5000):
+        self.path = path
+        self.capacity = max(1, capacity)
+        self.flush_sec = max(0.001, flush_ms / 1000.0)
+        self.id_block = max(1, id_block)
+        self.busy_ms = busy_ms
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._pid = None
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.busy_ms / 1000.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ready(self):
+        """Per-process setup on first use (and again in a forked child)."""
+        if self._pid == os.getpid():
+            return
+        with self._init_lock:
+            if self._pid != os.getpid():
+                self._setup()
+
+    def _setup(self):
+        conn = self._conn()
+        found = conn.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' "
+            "AND name IN ('guestbook', 'guestbook_ids');"
+        ).fetchone()[0]
+        if found != 2:
+            raise RuntimeError(
+                f"guestbook tables missing in {self.path}: run scripts/migrate.py "
+                "(005_guestbook.sql) or set GUESTBOOK_STORE=memory"
+            )
+        self._lock = threading.Lock()
+        self._ring = Guestbook(self.capacity)
+        self._last_seq = 0
+        self._pending = {}                 # id -> Message, insertion ordered
+        self._appends = 0
+        self._born = time.time_ns()
+        self._id_next = self._id_end = 0
+        self._q = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="authlab-guestbook", daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    # --- writes ---
+
+    def append(self, ts, user, message):
+        """Accept a message (returned with its id); it is written within flush_ms."""
+        self._ready()
+        with self._lock:
+            if self._id_next >= self._id_end:
+                self._reserve_ids()
+            rec = Message(self._id_next, ts, user, message)
+            self._id_next += 1
+            self._pending[rec.id] = rec
+            self._appends += 1
+            self._q.put(rec)  # under the lock: batches keep id order
+        return rec
+
+    def _reserve_ids(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            end = conn.execute(
+                "UPDATE guestbook_ids SET next_id = next_id + ? WHERE k = 0 RETURNING next_id;",
+                (self.id_block,),
+            ).fetchone()[0]
+            conn.execute("COMMIT;")
+        except BaseException:
+            conn.execute("ROLLBACK;")
+            raise
+        self._id_next, self._id_end = end - self.id_block, end
+
+    def close(self, timeout=5.0):
+        """Flush pending messages and stop the writer thread."""
+        if self._pid != os.getpid() or not self._thread.is_alive():
+            return
+        self._q.put(self._STOP)
+        self._thread.join(timeout)
+
+    def _run(self):
+        batch = []
+        stop = False
+        while not stop:
+            try:
+                rec = self._q.get() if not batch else self._q.get(timeout=self.flush_sec)
+            except queue.Empty:
+                rec = None
+            if rec is self._STOP:
+                stop = True
+            elif rec is not None:
+                batch.append(rec)
+                # Collect everything that arrives within one flush interval.
+                deadline = time.monotonic() + self.flush_sec
+                while True:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        rec = self._q.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if rec is self._STOP:
+                        stop = True
+                        break
+                    batch.append(rec)
+            if batch and self._write(batch):
+                batch = []
+
+    def _write(self, batch):
+        conn = self._conn()
+        try:
+            conn.execute("BEGIN IMMEDIATE;")
+            conn.executemany(
+                "INSERT INTO guestbook (id, ts, user, message) VALUES (?,?,?,?);",
+                [(r.id, r.ts, r.user, r.message) for r in batch],
+            )
+            conn.execute("COMMIT;")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK;")
+            return False
+        with self._lock:
+            for r in batch:
+                self._pending.pop(r.id, None)
+        return True
+
+    # --- reads ---
+
+    def _sync(self):
+        """Pull rows committed since the last read into the ring (lock held)."""
+        rows = self._conn().execute(
+            "SELECT seq, id, ts, user, message FROM guestbook WHERE seq > ? "
+            "ORDER BY seq DESC LIMIT ?;",
+            (self._last_seq, self.capacity),
+        ).fetchall()
+        for seq, msg_id, ts, user, message in reversed(rows):
+            self._ring.put(Message(msg_id, ts, user, message))
+            self._last_seq = seq
+
+    def _fresh(self):
+        """Unflushed local messages not yet seen in the ring, newest first."""
+        ring = self._ring
+        return [m for m in reversed(list(self._pending.values())) if ring.get(m.id) is None]
+
+    def __len__(self):
+        self._ready()
+        with self._lock:
+            self._sync()
+            return self._last_seq + len(self._fresh())
+
+    @property
+    def version(self):
+        """
+        Changes whenever the contents (as seen by this process) change.
+        Without unflushed local messages the contents are the first
+        last_seq rows, the same in every worker; otherwise the version is
+        private to this process (its pending list is).
+        """
+        self._ready()
+        with self._lock:
+            self._sync()
+            if not self._fresh():
+                return self._last_seq
+            return (self._last_seq, self._born, os.getpid(), self._appends)
+
+    def get(self, msg_id):
+        """
+        Message by id, or None: pending and hot-tail hits are dict lookups,
+        anything else is one probe of the UNIQUE(id) index.
+        """
+        self._ready()
+        with self._lock:
+            rec = self._pending.get(msg_id) or self._ring.get(msg_id)
+        if rec is not None:
+            return rec
+        row = self._conn().execute(
+            "SELECT id, ts, user, message FROM guestbook WHERE id = ?;", (msg_id,)
+        ).fetchone()
+        return Message(*row) if row else None
+
+    def newest(self, limit, offset=0):
+        """Up to limit messages, newest first, skipping the offset newest."""
+        self._ready()
+        with self._lock:
+            self._sync()
+            fresh = self._fresh()
+            items = fresh[offset:offset + limit]
+            skip = max(0, offset - len(fresh))
+            want = limit - len(items)
+            items += self._ring.newest(want, skip)
+            in_ring = len(self._ring)
+            last_seq = self._last_seq
+        # Older than the hot tail: read the table at the same snapshot.
+        table_off = max(skip, in_ring)
+        table_n = skip + want - table_off
+        if table_n > 0 and table_off < last_seq:
+            rows = self._conn().execute(
+                "SELECT id, ts, user, message FROM guestbook WHERE seq <= ? "
+                "ORDER BY seq DESC LIMIT ? OFFSET ?;",
+                (last_seq, table_n, table_off),
+            ).fetchall()
+            items += [Message(*r) for r in rows]
+        return items
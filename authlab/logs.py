@@ -0,0 +1,366 @@
+# authlab/logs.py
+
+"""
+Segmented authlab.log storage and reader.
+
+Layout inside the log directory:
+
+    authlab.log               active segment (plain NDJSON, appended to)
+    authlab.000002.sealing    rolled-over segment still being compressed
+    authlab.000001.log.gz     sealed segments (gzip, one member per block)
+    authlab.index.jsonl       one line per sealed segment:
+                              {"segment", "first_ts", "last_ts", "records",
+                               "blocks": [[first_ts, last_ts, offset, length], ...]}
+
+Each block of a sealed segment is an independent gzip member, so the reader
+seeks straight to the compressed byte offset of a matching block and never
+decompresses segments outside the requested time range.
+
+CLI (standalone, no app secrets needed; see scripts/logs_query.py):
+    python scripts/logs_query.py query --since 1h --route /login --reason csrf_bad
+"""
+
+import os
+import re
+import sys
+import json
+import gzip
+import zlib
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows: rotation is not coordinated across processes
+    fcntl = None
+
+BLOCK_BYTES = 64 * 1024
+_SEG_RE = re.compile(r"\.(\d{6})\.(?:log\.gz|sealing)$")
+
+
+def parse_ts(ts):
+    """Parse an authlab ISO8601 'Z' timestamp into a naive UTC datetime."""
+    return datetime.fromisoformat(ts.rstrip("Z"))
+
+
+def parse_when(val, now=None):
+    """
+    Parse a CLI time bound: ISO8601 ('2025-10-20T12:00:00Z') or relative
+    to now ('90s', '15m', '1h', '2d').
+    """
+    m = re.fullmatch(r"(\d+)([smhd])", val.strip())
+    if m:
+        unit = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}[m.group(2)]
+        return (now or datetime.utcnow()) - timedelta(**{unit: int(m.group(1))})
+    return parse_ts(val.strip())
+
+
+class SegmentedLog:
+    """
+    Append-only NDJSON log that rolls over at max_bytes.
+
+    On rollover the active file is renamed to the next numbered .sealing
+    file under a short cross-process lock; a background thread then
+    compresses it block by block into the .gz segment, appends one index
+    line and removes it, so the append that crossed max_bytes does not
+    pay for the compression. Readers treat .sealing files as plain NDJSON
+    until their segment is indexed; one left behind by a killed process is
+    sealed on the next rollover. max_bytes=0 disables rotation.
+    """
+
+    def __init__(self, path, max_bytes=0, block_bytes=BLOCK_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.block_bytes = block_bytes
+        self.dir = os.path.dirname(path) or "."
+        self.base = os.path.splitext(os.path.basename(path))[0]
+        self.index_path = os.path.join(self.dir, f"{self.base}.index.jsonl")
+        self._fh = None
+
+    def append(self, text, keep_open=False):
+        """
+        Append serialized records and roll over when the segment is full.
+
+        keep_open=True keeps one long-lived handle (async writer); otherwise
+        the file is opened and closed per call (sync mode).
+
+        Each write holds a shared flock on the segment and starts only once
+        the path is confirmed to still name it. The sealer takes the
+        exclusive flock after renaming, so it waits for writes already in
+        flight, and later writers reopen the new active file: records are
+        never written into a segment another process has sealed.
+        """
+        while True:
+            f, self._fh = self._fh, None
+            if f is None:
+                f = open(self.path, "a", encoding="utf-8")
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_SH)
+            if not _rotated_away(f, self.path):
+                break
+            f.close()  # also drops the flock
+        try:
+            f.write(text)
+            f.flush()
+            size = f.tell()
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            if keep_open:
+                self._fh = f
+            else:
+                f.close()
+        if self.max_bytes and size >= self.max_bytes:
+            self.rotate()
+
+    def close(self):
+        """Close the long-lived handle, if any (it is released even if close fails)."""
+        fh, self._fh = self._fh, None
+        if fh is not None:
+            fh.close()
+
+    def rotate(self, wait=False):
+        """
+        Roll the active file over and seal it in the background (wait=True
+        seals inline). Returns the sealing thread, or None if there was
+        nothing to do.
+        """
+        self.close()
+        lock_path = os.path.join(self.dir, f"{self.base}.lock")
+        with open(lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # Another process may have rotated while we waited for the lock.
+                if not os.path.exists(self.path) or os.path.getsize(self.path) < self.max_bytes:
+                    return None
+                seq = self._next_seq()
+                os.replace(self.path, self._sealing_path(seq))
+                pending = self._orphans(seq)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        # Not a daemon: the interpreter finishes the seal before exiting.
+        t = threading.Thread(
+            target=self._seal_all, args=([seq] + pending,), name="authlab-log-seal"
+        )
+        t.start()
+        if wait:
+            t.join()
+        return t
+
+    def _sealing_path(self, seq):
+        return os.path.join(self.dir, f"{self.base}.{seq:06d}.sealing")
+
+    def _orphans(self, seq):
+        """Older .sealing files nobody is sealing (left by a killed process)."""
+        found = []
+        for name in os.listdir(self.dir):
+            m = _SEG_RE.search(name)
+            if m and name.endswith(".sealing") and name.startswith(self.base + "."):
+                n = int(m.group(1))
+                if n != seq and not _held(self._sealing_path(n)):
+                    found.append(n)
+        return sorted(found)
+
+    def _seal_all(self, seqs):
+        """Seal seqs[0] (just renamed: wait out in-flight writes), then orphans."""
+        for k, seq in enumerate(seqs):
+            src = self._sealing_path(seq)
+            try:
+                with open(src, "rb") as guard:
+                    # Held while sealing, so _orphans() leaves this file alone.
+                    if fcntl is not None:
+                        try:
+                            fcntl.flock(guard, fcntl.LOCK_EX | (fcntl.LOCK_NB if k else 0))
+                        except BlockingIOError:
+                            continue  # another process is on it
+                    if not os.path.exists(src):
+                        continue  # sealed and removed while we waited
+                    self._seal(src, seq)
+                    os.remove(src)
+            except FileNotFoundError:
+                continue
+
+    def _next_seq(self):
+        seqs = [int(m.group(1)) for m in map(_SEG_RE.search, os.listdir(self.dir)) if m]
+        return max(seqs, default=0) + 1
+
+    def _seal(self, src, seq):
+        name = f"{self.base}.{seq:06d}.log.gz"
+        blocks = []
+        records = 0
+        with open(src, "rb") as fin, open(os.path.join(self.dir, name), "wb") as fout:
+            buf, lo, hi = [], None, None
+            size = 0
+            for line in fin:
+                ts = _line_ts(line)
+                if ts is not None:
+                    lo = ts if lo is None or parse_ts(ts) < parse_ts(lo) else lo
+                    hi = ts if hi is None or parse_ts(ts) > parse_ts(hi) else hi
+                buf.append(line)
+                size += len(line)
+                records += 1
+                if size >= self.block_bytes:
+                    blocks.append(_write_block(fout, buf, lo, hi))
+                    buf, lo, hi, size = [], None, None, 0
+            if buf:
+                blocks.append(_write_block(fout, buf, lo, hi))
+
+        entry = {
+            "segment": name,
+            "first_ts": min((b[0] for b in blocks if b[0]), key=parse_ts, default=None),
+            "last_ts": max((b[1] for b in blocks if b[1]), key=parse_ts, default=None),
+            "records": records,
+            "blocks": blocks,
+        }
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+
+
+def _rotated_away(f, path):
+    """True if the open handle f no longer is the file at path (it was rotated)."""
+    try:
+        return os.fstat(f.fileno()).st_ino != os.stat(path).st_ino
+    except FileNotFoundError:
+        return True
+
+
+def _held(path):
+    """True if another open file description holds path's flock."""
+    if fcntl is None:
+        return True  # cannot tell: never steal a seal
+    try:
+        with open(path, "rb") as f:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            fcntl.flock(f, fcntl.LOCK_UN)
+        return False
+    except BlockingIOError:
+        return True
+    except FileNotFoundError:
+        return True
+
+
+def _line_ts(line):
+    try:
+        return json.loads(line)["ts"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_block(fout, lines, lo, hi):
+    offset = fout.tell()
+    fout.write(gzip.compress(b"".join(lines)))
+    return [lo, hi, offset, fout.tell() - offset]
+
+
+def _overlaps(lo, hi, since, until):
+    if lo is None or hi is None:
+        return True
+    if since is not None and parse_ts(hi) < since:
+        return False
+    if until is not None and parse_ts(lo) > until:
+        return False
+    return True
+
+
+def query(path, since=None, until=None, **match):
+    """
+    Stream records from sealed segments, segments still being sealed and
+    the active file.
+
+    since/until are naive UTC datetimes (inclusive bounds); match holds
+    exact-value filters on record fields (route=..., result=..., reason=...,
+    username=..., ip=...). Only blocks whose time range overlaps
+    [since, until] are read.
+    """
+    log = SegmentedLog(path)
+    match = {k: v for k, v in match.items() if v is not None}
+
+    def wanted(rec):
+        ts = parse_ts(rec["ts"])
+        if since is not None and ts < since:
+            return False
+        if until is not None and ts > until:
+            return False
+        return all(rec.get(k) == v for k, v in match.items())
+
+    # List .sealing files before reading the index: one sealed in between
+    # is then found in the index and skipped.
+    names = os.listdir(log.dir) if os.path.isdir(log.dir) else []
+    segments = {
+        int(_SEG_RE.search(n).group(1)): os.path.join(log.dir, n)
+        for n in names
+        if n.startswith(log.base + ".") and n.endswith(".sealing")
+    }
+    if os.path.exists(log.index_path):
+        with open(log.index_path, encoding="utf-8") as idx:
+            for line in idx:
+                if line.strip():
+                    entry = json.loads(line)
+                    segments[int(_SEG_RE.search(entry["segment"]).group(1))] = entry
+
+    def plain(p):
+        try:
+            with open(p, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    rec = json.loads(line)
+                    if wanted(rec):
+                        yield rec
+        except FileNotFoundError:
+            return
+
+    # Segment order, whichever order background seals finished in.
+    for seq in sorted(segments):
+        entry = segments[seq]
+        if isinstance(entry, str):
+            yield from plain(entry)
+            continue
+        if not _overlaps(entry["first_ts"], entry["last_ts"], since, until):
+            continue
+        with open(os.path.join(log.dir, entry["segment"]), "rb") as f:
+            for lo, hi, offset, length in entry["blocks"]:
+                if not _overlaps(lo, hi, since, until):
+                    continue
+                f.seek(offset)
+                data = zlib.decompress(f.read(length), wbits=31)
+                for line in data.splitlines():
+                    rec = json.loads(line)
+                    if wanted(rec):
+                        yield rec
+
+    yield from plain(path)
+
+
+def main(argv=None, prog="python -m authlab.logs"):
+    """CLI entry point: scripts/logs_query.py query [filters]."""
+    parser = argparse.ArgumentParser(prog=prog)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    q = sub.add_parser("query", help="stream matching records as NDJSON")
+    q.add_argument("--file", default=os.path.join("logs", "authlab.log"))
+    q.add_argument("--since", help="ISO8601 or relative (15m, 1h, 2d)")
+    q.add_argument("--until", help="ISO8601 or relative (15m, 1h, 2d)")
+    for field in ("route", "result", "reason", "username", "ip"):
+        q.add_argument(f"--{field}")
+    q.add_argument("--limit", type=int, default=0, help="stop after N records")
+    args = parser.parse_args(argv)
+
+    since = parse_when(args.since) if args.since else None
+    until = parse_when(args.until) if args.until else None
+    n = 0
+    for rec in query(
+        args.file, since=since, until=until, route=args.route, result=args.result,
+        reason=args.reason, username=args.username, ip=args.ip,
+    ):
+        sys.stdout.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        n += 1
+        if args.limit and n >= args.limit:
+            break
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
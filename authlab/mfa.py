@@ -0,0 +1,105 @@
+# authlab/mfa.py
+
+"""
+TOTP verification with cached per-user verifiers and replay rejection.
+
+- TotpVerifier: one user's secret decoded once (pyotp.TOTP); the codes of
+  the 2 * window + 1 accepted time steps are precomputed into a
+  code -> counter dict and rebuilt only when the current step rolls over,
+  so a check is a dict lookup instead of window HMACs.
+- TotpGuard: LRU of verifiers keyed by (user, secret) plus a used-code
+  store, so an accepted code cannot be submitted again while it is valid.
+
+The used-code store is any rate-limit store (authlab/ratelimit.py): a
+claim is one atomic store step under key "mfa_used:<user>|<counter>"
+that expires when the code leaves the acceptance window, so the store
+stays bounded and cleans itself up. With the SQLite store, replays are
+rejected across workers too.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+import pyotp
+
+
+def claim_once(expires_at):
+    """Store step: allowed only if the key was never claimed (until expires_at)."""
+
+    def step(state):
+        if state is not None:
+            return False, 0, None, expires_at
+        return True, 0, (1,), expires_at
+    return step
+
+
+class TotpVerifier:
+    """Precomputed codes for the accepted steps around the current one."""
+
+    def __init__(self, secret, window=1):
+        self.totp = pyotp.TOTP(secret)
+        self.interval = self.totp.interval
+        self.window = max(0, window)
+        self._codes = (None, {})   # (step, {code: counter}), swapped atomically
+
+    def codes(self, now):
+        """code -> counter for the steps within window of now."""
+        step = int(now // self.interval)
+        cached_step, codes = self._codes
+        if cached_step != step:
+            codes = {}
+            for counter in range(step - self.window, step + self.window + 1):
+                codes.setdefault(self.totp.generate_otp(counter), counter)
+            self._codes = (step, codes)
+        return codes
+
+    def match(self, code, now):
+        """Counter of the step the code belongs to, or None."""
+        return self.codes(now).get(code)
+
+    def expires_at(self, counter):
+        """Time at which a code for counter stops being accepted."""
+        return (counter + self.window + 1) * self.interval
+
+
+class TotpGuard:
+    """Cached verifiers (max_users, LRU) and one-time use of accepted codes."""
+
+    def __init__(self, used_store, window=1, max_users=1024):
+        self.used = used_store
+        self.window = window
+        self.max_users = max(1, max_users)
+        self._verifiers = OrderedDict()   # (user, secret) -> TotpVerifier
+        self._lock = threading.Lock()
+
+    def verifier(self, user, secret):
+        key = (user, secret)
+        with self._lock:
+            v = self._verifiers.get(key)
+            if v is not None:
+                self._verifiers.move_to_end(key)
+                return v
+        v = TotpVerifier(secret, self.window)
+        with self._lock:
+            v = self._verifiers.setdefault(key, v)
+            while len(self._verifiers) > self.max_users:
+                self._verifiers.popitem(last=False)
+        return v
+
+    def verify(self, user, secret, code, now=None):
+        """
+        Check a submitted code. Returns (ok, reason) with reason one of
+        mfa_ok, mfa_bad (not a current code) or mfa_replay (already used).
+        """
+        if now is None:
+            now = time.time()
+        v = self.verifier(user, secret)
+        counter = v.match(code, now)
+        if counter is None:
+            return False, "mfa_bad"
+        key = f"mfa_used:{user}|{counter}"
+        first, _ = self.used.hit(key, now, claim_once(v.expires_at(counter)))
+        if not first:
+            return False, "mfa_replay"
+        return True, "mfa_ok"
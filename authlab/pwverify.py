@@ -0,0 +1,163 @@
+# authlab/pwverify.py
+
+"""
+Bounded off-thread password verification.
+
+scrypt (werkzeug's default hash) costs ~100 ms of CPU and tens of MB per
+check. Run inline, a burst of logins occupies every request thread and
+core, and cheap endpoints queue behind it. PasswordVerifier runs
+check_password_hash in a small process pool instead and caps how many
+checks may be queued or running at once:
+
+- at most `workers` hashes run in parallel (one core each);
+- at most `max_inflight` checks are admitted (running + queued);
+  beyond that verify() raises VerifierBusy at once instead of queuing,
+  so the caller can answer 503 + Retry-After without hashing.
+
+A slot is released when its hash finishes, not when the caller stops
+waiting, so timed-out checks still count against the cap.
+
+The pool is created lazily per process (forked workers get their own) and
+uses the forkserver start method where available: pool workers are forked
+from a clean single-threaded server instead of a threaded app process.
+workers=0 verifies inline (no pool) with the same accounting.
+"""
+
+import os
+import time
+import threading
+import multiprocessing as mp
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import check_password_hash
+
+
+class VerifierBusy(Exception):
+    """Admission refused (pool full, timed out or broken); retry later."""
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class PasswordVerifier:
+    """check_password_hash behind a size-limited process pool."""
+
+    def __init__(self, workers=1, max_inflight=4, timeout=10.0, retry_after=1, samples=1024):
+        self.workers = max(0, workers)
+        self.max_inflight = max(1, max_inflight)
+        self.timeout = timeout
+        self.retry_after = max(1, int(retry_after))
+        self.stats = {"verified": 0, "busy": 0, "timeouts": 0, "errors": 0}
+        self._slots = threading.BoundedSemaphore(self.max_inflight)
+        self._inflight = 0
+        self._lock = threading.Lock()
+        self._latency = deque(maxlen=samples)   # seconds, submit -> result
+        self._pool = None
+        self._pid = None
+
+    def _executor(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    methods = mp.get_all_start_methods()
+                    ctx = mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+                    self._pool = ProcessPoolExecutor(self.workers, mp_context=ctx)
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._inflight -= 1
+        self._slots.release()
+
+    def verify(self, pwhash, password):
+        """
+        True/False like check_password_hash; raises VerifierBusy when no
+        slot is free, the check exceeds timeout, or the pool died.
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.stats["busy"] += 1
+            raise VerifierBusy("full", self.retry_after)
+        with self._lock:
+            self._inflight += 1
+        t0 = time.perf_counter()
+
+        if not self.workers:
+            try:
+                ok = check_password_hash(pwhash, password)
+            finally:
+                self._release()
+            self._done(t0)
+            return ok
+
+        pool = self._executor()
+        try:
+            future = pool.submit(check_password_hash, pwhash, password)
+        except (BrokenProcessPool, RuntimeError):
+            # Broken or shut down before we got in: same answer as a crash below.
+            self._release()
+            self._discard(pool)
+            raise VerifierBusy("pool_broken", self.retry_after)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        try:
+            ok = future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.stats["timeouts"] += 1
+            raise VerifierBusy("timeout", self.retry_after)
+        except BrokenProcessPool:
+            self._discard(pool)
+            raise VerifierBusy("pool_broken", self.retry_after)
+        self._done(t0)
+        return ok
+
+    def _discard(self, pool):
+        """A worker died (e.g. OOM-killed): drop the pool, start a fresh one next time."""
+        with self._lock:
+            self.stats["errors"] += 1
+            if self._pool is not pool:
+                return  # another thread already replaced it
+            self._pool = None
+            self._pid = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _done(self, t0):
+        with self._lock:
+            self.stats["verified"] += 1
+            self._latency.append(time.perf_counter() - t0)
+
+    @property
+    def inflight(self):
+        """Checks admitted and not finished (running + queued)."""
+        return self._inflight
+
+    @property
+    def queued(self):
+        """Admitted checks waiting for a free worker."""
+        return max(0, self._inflight - max(1, self.workers))
+
+    def info(self):
+        """Counters, current depth and latency percentiles (ms, incl. queue wait)."""
+        with self._lock:
+            lat = sorted(self._latency)
+            info = dict(self.stats, workers=self.workers, max_inflight=self.max_inflight,
+                        inflight=self._inflight, queued=self.queued)
+        if lat:
+            pct = lambda p: round(1e3 * lat[min(len(lat) - 1, int(p * len(lat)))], 1)
+            info.update(p50_ms=pct(0.50), p95_ms=pct(0.95), max_ms=round(1e3 * lat[-1], 1))
+        return info
+
+    def close(self):
+        """Shut the pool down (running checks finish first)."""
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+            self._pid = None
@@ -0,0 +1,324 @@
+# authlab/ratelimit.py
+
+"""
+Rate-limit algorithms and state stores.
+
+A store maps rate_key -> algorithm state (a tuple of up to 3 numbers) and
+applies one limiter step atomically per call. Algorithms are plain
+functions returning a step:
+
+    step(state_or_None) -> (allowed, retry_after, new_state, expires_at)
+
+so the same algorithm runs unchanged on any store. Every algorithm takes a
+request cost (tokens charged for this request, clamped to max_attempts so
+an expensive request still fits into an empty budget).
+- MemoryRateStore: per-process dict (default).
+- SqliteRateStore: WAL-mode SQLite table shared by all workers on a host.
+"""
+
+import os
+import heapq
+import itertools
+import sqlite3
+import threading
+
+
+def fixed_window(now, window_sec, max_attempts, cost=1):
+    """Fixed-window step: state = (window_start, count)."""
+    cost = min(max(1, cost), max_attempts)
+
+    def step(state):
+        if state is None or now >= state[0] + window_sec:
+            state = (now, 0)
+        start, count = int(state[0]), int(state[1])
+        if count + cost > max_attempts:
+            retry_after = (start + window_sec) - now
+            if retry_after < 1:
+                retry_after = 1
+            return False, retry_after, None, start + window_sec
+        return True, 0, (start, count + cost), start + window_sec
+    return step
+
+
+def sliding_window(now, window_sec, max_attempts, cost=1):
+    """
+    Sliding-window-counter step: state = (window_start, prev_count, count).
+
+    The previous window's count is weighted by how much of it still
+    overlaps the sliding window, which removes the 2x burst a fixed window
+    allows at its boundary.
+    """
+    cost = min(max(1, cost), max_attempts)
+
+    def step(state):
+        if state is None:
+            start, prev, curr = now - now % window_sec, 0, 0
+        else:
+            start, prev, curr = state
+            shift = int((now - start) // window_sec)
+            if shift == 1:
+                start, prev, curr = start + window_sec, curr, 0
+            elif shift > 1:
+                start, prev, curr = now - now % window_sec, 0, 0
+        elapsed = now - start
+        if prev * (1 - elapsed / window_sec) + curr + cost <= max_attempts:
+            return True, 0, (start, prev, curr + cost), start + 2 * window_sec
+        if curr + cost <= max_attempts:
+            # Wait until enough of the previous window has slid out.
+            wait = window_sec * (1 - (max_attempts - curr - cost) / prev) - elapsed
+        else:
+            # Current window is full: wait for it to become "previous" and decay.
+            wait = (window_sec - elapsed) + max(
+                0.0, window_sec * (1 - (max_attempts - cost) / curr)
+            )
+        return False, max(1, int(-(-wait // 1))), None, start + 2 * window_sec
+    return step
+
+
+def gcra(now, window_sec, max_attempts, cost=1):
+    """
+    Generic Cell Rate Algorithm step: state = (tat,).
+
+    Requests are spaced by emission interval window_sec / max_attempts with a
+    burst tolerance of max_attempts requests. Only the theoretical arrival
+    time (TAT) is stored; Retry-After is the exact time until the next
+    request conforms, rounded up to whole seconds.
+    """
+    interval = window_sec / max_attempts
+    cost = min(max(1, cost), max_attempts)
+
+    def step(state):
+        tat = max(state[0], now) if state else now
+        new_tat = tat + interval * cost
+        if new_tat - now > window_sec:
+            wait = new_tat - window_sec - now
+            return False, max(1, int(-(-wait // 1))), None, tat
+        return True, 0, (new_tat,), new_tat
+    return step
+
+
+ALGORITHMS = {
+    "fixed": fixed_window,
+    "sliding": sliding_window,
+    "gcra": gcra,
+}
+
+
+class MemoryRateStore:
+    """
+    In-process store with a hard entry cap and self-expiring windows.
+
+    Every state carries an absolute expiry (end of its window). Keys are
+    filed into expiry-ordered buckets (one bucket per expiry second, bucket
+    times in a min-heap), and each call pops only the buckets that are due,
+    so expiry costs amortized O(1) per key instead of full scans. A bucket
+    may hold stale references to keys that were renewed later; those are
+    skipped when the bucket is drained.
+
+    When the store is full and nothing is due, the entry closest to expiry
+    is evicted to admit the new key (it has the least protection left).
+
+    Thread safety: each key hashes to one of `stripes` locks, held for the
+    whole read-step-write of hit(), so concurrent hits on one key never
+    lose counts while different keys rarely wait on each other. The dict,
+    buckets and heap are shared by all keys and are only touched under a
+    short global lock (the step itself runs outside it).
+    """
+
+    def __init__(self, max_entries=100_000, stripes=64):
+        self.max_entries = max(1, max_entries)
+        self.stats = {"expired": 0, "evicted": 0}
+        self._data = {}      # key -> (state, expires_at)
+        self._buckets = {}   # expires_at -> [key, ...]
+        self._heap = []      # bucket expiry times
+        self._lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(max(1, stripes))]
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, now):
+        """Return the live state for key, or None if missing/expired."""
+        item = self._data.get(key)
+        if item is None or item[1] <= now:
+            return None
+        return item[0]
+
+    def hit(self, key, now, step):
+        """Run one limiter step for key and store its new state."""
+        self.expire(now)
+        with self._stripes[hash(key) % len(self._stripes)]:
+            allowed, retry_after, new_state, expires_at = step(self.get(key, now))
+            if new_state is not None:
+                with self._lock:
+                    self._put(key, new_state, expires_at)
+        return allowed, retry_after
+
+    def expire(self, now):
+        """Drop every entry whose window has ended by now."""
+        due = self._heap[:1]  # lock-free peek; the slice is taken atomically
+        if not due or due[0] > now:
+            return
+        with self._lock:
+            self._expire(now)
+
+    def _expire(self, now):
+        heap, buckets, data = self._heap, self._buckets, self._data
+        while heap and heap[0] <= now:
+            t = heapq.heappop(heap)
+            for key in buckets.pop(t, ()):
+                item = data.get(key)
+                if item is not None and item[1] == t:
+                    del data[key]
+                    self.stats["expired"] += 1
+
+    def clear(self):
+        """Forget all state (counters are kept)."""
+        with self._lock:
+            self._data.clear()
+            self._buckets.clear()
+            self._heap.clear()
+
+    def _put(self, key, state, expires_at):
+        expires_at = int(-(-expires_at // 1))  # ceil to whole-second buckets
+        old = self._data.get(key)
+        if old is None and len(self._data) >= self.max_entries:
+            self._evict_one()
+        self._data[key] = (state, expires_at)
+        if old is not None and old[1] == expires_at:
+            return
+        bucket = self._buckets.get(expires_at)
+        if bucket is None:
+            bucket = self._buckets[expires_at] = []
+            heapq.heappush(self._heap, expires_at)
+        bucket.append(key)
+
+    def _evict_one(self):
+        heap, buckets, data = self._heap, self._buckets, self._data
+        while heap:
+            t = heap[0]
+            bucket = buckets.get(t)
+            while bucket:
+                key = bucket.pop()
+                item = data.get(key)
+                if item is not None and item[1] == t:
+                    del data[key]
+                    self.stats["evicted"] += 1
+                    return
+            buckets.pop(t, None)
+            heapq.heappop(heap)
+
+
+class SqliteRateStore:
+    """
+    Rate-limit state shared across processes through one SQLite file.
+
+    Each hit is a single BEGIN IMMEDIATE transaction (read state, run the
+    step, upsert), so concurrent workers serialize on the file lock and
+    never lose counts. The file is ephemeral state: WAL mode with
+    synchronous=OFF keeps a check in the tens of microseconds; put it on
+    tmpfs (/dev/shm) for best results.
+
+    Dead windows are deleted in one indexed sweep every sweep_every hits
+    per process; if the table still holds more than max_entries rows, the
+    entries closest to expiry are evicted. Stores with different `table`
+    names share the file but never each other's cap, sweep or clear().
+    """
+
+    def __init__(self, path, max_entries=100_000, sweep_every=1024, table="rate_state"):
+        if not table.isidentifier():
+            raise ValueError(f"bad table name: {table!r}")
+        self.path = path
+        self.table = table
+        self.max_entries = max(1, max_entries)
+        self.sweep_every = max(1, sweep_every)
+        self.stats = {"expired": 0, "evicted": 0}
+        self._local = threading.local()
+        self._hits = itertools.count(1)
+        conn = self._conn()
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key        TEXT PRIMARY KEY,
+                a          REAL,
+                b          REAL,
+                c          REAL,
+                expires_at INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        """)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_expires ON {table}(expires_at);"
+        )
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=OFF;")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def __len__(self):
+        return self._conn().execute(f"SELECT COUNT(*) FROM {self.table};").fetchone()[0]
+
+    def get(self, key, now):
+        """Return the live state for key, or None if missing/expired."""
+        row = self._conn().execute(
+            f"SELECT a, b, c FROM {self.table} WHERE key = ? AND expires_at > ?;",
+            (key, now),
+        ).fetchone()
+        return _unpack(row)
+
+    def hit(self, key, now, step):
+        """Run one limiter step for key atomically across processes."""
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            row = conn.execute(
+                f"SELECT a, b, c FROM {self.table} WHERE key = ? AND expires_at > ?;",
+                (key, now),
+            ).fetchone()
+            allowed, retry_after, new_state, expires_at = step(_unpack(row))
+            if new_state is not None:
+                a, b, c = (tuple(new_state) + (None, None, None))[:3]
+                conn.execute(
+                    f"INSERT INTO {self.table} (key, a, b, c, expires_at) VALUES (?,?,?,?,?) "
+                    "ON CONFLICT(key) DO UPDATE SET a=excluded.a, b=excluded.b, "
+                    "c=excluded.c, expires_at=excluded.expires_at;",
+                    (key, a, b, c, int(-(-expires_at // 1))),
+                )
+            conn.execute("COMMIT;")
+        except BaseException:
+            conn.execute("ROLLBACK;")
+            raise
+        if next(self._hits) % self.sweep_every == 0:
+            self.expire(now)
+        return allowed, retry_after
+
+    def expire(self, now):
+        """Delete dead windows and enforce the entry cap."""
+        conn = self._conn()
+        cur = conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?;", (now,))
+        self.stats["expired"] += max(0, cur.rowcount)
+        over = len(self) - self.max_entries
+        if over > 0:
+            cur = conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY expires_at LIMIT ?);",
+                (over,),
+            )
+            self.stats["evicted"] += max(0, cur.rowcount)
+
+    def clear(self):
+        """Forget all state (counters are kept)."""
+        self._conn().execute(f"DELETE FROM {self.table};")
+
+
+def _unpack(row):
+    if row is None:
+        return None
+    return tuple(v for v in row if v is not None)
@@ -1,8 +1,8 @@
 # authlab/web/auth_html.py
 
+import time
 import secrets
 
-import pyotp
 from flask import (
     render_template,
     request,
@@ -11,9 +11,9 @@ from flask import (
     session,
     make_response,
 )
-from werkzeug.security import check_password_hash
 
 from authlab import core
+from authlab.pwverify import VerifierBusy
 from authlab.web import web_bp
 
 
@@ -39,7 +39,7 @@ def login_post():
     Flow:
     1. CSRF check.
     2. Rate-limit before user lookup.
-    3. Password check.
+    3. Password check in the bounded verifier pool (503 + Retry-After when full).
     4. If MFA enabled - redirect to /mfa, otherwise log in and go to dashboard.
     """
     username = (request.form.get("username") or "").strip()
@@ -87,8 +87,32 @@ def login_post():
             401,
         )
 
-    if not check_password_hash(user["password_hash"], password):
-        core.log_attempt(username, True, "invalid", "bad_password", route=request.path)
+    queued = core.PW_VERIFIER.queued
+    t0 = time.perf_counter()
+    try:
+        ok = core.PW_VERIFIER.verify(user["password_hash"], password)
+    except VerifierBusy as e:
+        # Verification capacity exhausted: shed load before hashing.
+        core.log_attempt(
+            username, True, "invalid", "verify_busy", route=request.path,
+            meta={"why": e.reason, "inflight": core.PW_VERIFIER.inflight},
+        )
+        resp = make_response(
+            render_template(
+                "login.html",
+                error="Server busy, try again shortly",
+                csrf_token=session["csrf_token"],
+            ),
+            503,
+        )
+        resp.headers["Retry-After"] = str(e.retry_after)
+        return resp
+    pw_meta = {"verify_ms": round(1e3 * (time.perf_counter() - t0), 1), "queued": queued}
+
+    if not ok:
+        core.log_attempt(
+            username, True, "invalid", "bad_password", route=request.path, meta=pw_meta
+        )
         return (
             render_template(
                 "login.html",
@@ -100,12 +124,12 @@ def login_post():
 
     if user["mfa_enabled"]:
         session["pending_user"] = username
-        core.log_attempt(username, True, "mfa_required", "-", route=request.path)
+        core.log_attempt(username, True, "mfa_required", "-", route=request.path, meta=pw_meta)
         return redirect(url_for("web.mfa_get"))
 
     session.clear()
     session["user"] = username
-    core.log_attempt(username, True, "success", "-", route=request.path)
+    core.log_attempt(username, True, "success", "-", route=request.path, meta=pw_meta)
     return redirect(url_for("web.dashboard"))
 
 
@@ -136,7 +160,7 @@ def mfa_post():
     Flow:
     1. CSRF check.
     2. Rate-limit by username+IP.
-    3. Verify TOTP code.
+    3. Verify TOTP code (cached verifier; an accepted code is single-use).
     4. On success - clear session and set session["user"].
     """
     pending_user = session.get("pending_user")
@@ -184,18 +208,17 @@ def mfa_post():
         return redirect(url_for("web.login_get"))
 
     code = (request.form.get("code") or "").strip()
-    ok = False
+    ok, reason = False, "mfa_bad"
     if code and code.isdigit():
-        totp = pyotp.TOTP(user["mfa_secret"])
-        ok = totp.verify(code, valid_window=core.MFA_WINDOW)
+        ok, reason = core.MFA_GUARD.verify(pending_user.lower(), user["mfa_secret"], code)
 
     if ok:
         session.clear()
         session["user"] = pending_user
-        core.log_attempt(pending_user, True, "success", "mfa_ok", route=request.path)
+        core.log_attempt(pending_user, True, "success", reason, route=request.path)
         return redirect(url_for("web.dashboard"))
 
-    core.log_attempt(pending_user, True, "invalid", "mfa_bad", route=request.path)
+    core.log_attempt(pending_user, True, "invalid", reason, route=request.path)
     new_token = secrets.token_hex(32)
     session["csrf_token"] = new_token
     return (
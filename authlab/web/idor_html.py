@@ -1,7 +1,5 @@
 # authlab/web/idor_html.py
 
-import sqlite3
-
 from flask import (
     render_template,
     request,
@@ -22,14 +20,13 @@ def notes_index():
     if not user:
         return redirect(url_for("web.login_get"))
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, title, owner FROM notes WHERE owner = ? ORDER BY id",
-            (user,),
-        )
-        notes = cur.fetchall()
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, title, owner FROM notes WHERE owner = ? ORDER BY id",
+        (user,),
+    )
+    notes = cur.fetchall()
 
     reason = "index_poc" if core.IDOR_STATE == "poc" else "index_safe"
     core.log_attempt(
@@ -50,14 +47,13 @@ def note_view(note_id: int):
     if not user:
         return redirect(url_for("web.login_get"))
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT id, title, body, owner FROM notes WHERE id = ?",
-            (note_id,),
-        )
-        note = cur.fetchone()
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, title, body, owner FROM notes WHERE id = ?",
+        (note_id,),
+    )
+    note = cur.fetchone()
 
     if core.IDOR_STATE == "poc":
         reason = "no_owner_check"
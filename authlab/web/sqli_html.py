@@ -1,7 +1,5 @@
 # authlab/web/sqli_html.py
 
-import sqlite3
-
 from flask import (
     render_template,
     request,
@@ -24,20 +22,19 @@ def products():
     q = request.args.get("q", "")
     reason = "concat_raw" if core.SQLI_STATE == "poc" else "param_safe"
 
-    with sqlite3.connect("authlab.db") as conn:
-        conn.row_factory = sqlite3.Row
-        cur = conn.cursor()
-        if core.SQLI_STATE == "poc":
-            sql = f"SELECT id, name, price FROM products WHERE name LIKE '%{q}%';"
-            cur.execute(sql)
-            results = cur.fetchall()
-        else:
-            search = f"%{q}%"
-            cur.execute(
-                "SELECT id, name, price FROM products WHERE name LIKE ?;",
-                (search,),
-            )
-            results = cur.fetchall()
+    conn = core.db_conn(readonly=True)
+    cur = conn.cursor()
+    if core.SQLI_STATE == "poc":
+        sql = f"SELECT id, name, price FROM products WHERE name LIKE '%{q}%';"
+        cur.execute(sql)
+        results = cur.fetchall()
+    else:
+        search = f"%{q}%"
+        cur.execute(
+            "SELECT id, name, price FROM products WHERE name LIKE ?;",
+            (search,),
+        )
+        results = cur.fetchall()
 
     core.log_attempt(
         user,
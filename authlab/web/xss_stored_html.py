@@ -3,6 +3,7 @@
 import secrets
 
 from flask import (
+    get_template_attribute,
     render_template,
     request,
     redirect,
@@ -13,6 +14,48 @@ from flask import (
 from authlab import core
 from authlab.web import web_bp
 
+
+def _message_items(messages):
+    """
+    Rendered <li> fragments for messages. Each message is rendered (and
+    escaped, in safe mode) once per XSS_S_STATE, then served from
+    core.GUESTBOOK_FRAGMENTS; a page view only joins cached strings.
+    """
+    state = core.XSS_S_STATE
+    cache = core.GUESTBOOK_FRAGMENTS
+    render = get_template_attribute("guestbook_item.html", "message_item")
+    items = []
+    for m in messages:
+        key = (m.id, state)
+        hit = cache.get(key, state)
+        if hit is not None:
+            items.append(hit[0])
+            continue
+        html = render(m, state)
+        cache.put(key, state, html)
+        items.append(html)
+    return items
+
+
+def _render_guestbook(token, error=None, status=200):
+    """Render one page (?page=, newest first) of the guestbook."""
+    size = max(1, core.GUESTBOOK_PAGE)
+    pages = max(1, -(-len(core.GUESTBOOK) // size))
+    page = core.parse_int(request.args.get("page"), default=1, min_v=1, max_v=pages)
+    messages = core.GUESTBOOK.newest(size, (page - 1) * size)
+    html = render_template(
+        "guestbook.html",
+        items=_message_items(messages),
+        page=page,
+        pages=pages,
+        csrf_token=token,
+        state=core.XSS_S_STATE,
+        error=error,
+        max_len=core.MAX_MSG_LEN,
+    )
+    return html, status
+
+
 @web_bp.get("/guestbook")
 def guestbook_get():
     """Render guestbook with stored XSS surface."""
@@ -34,13 +77,7 @@ def guestbook_get():
         route=request.path,
         meta={"count": len(core.GUESTBOOK)},
     )
-    return render_template(
-        "guestbook.html",
-        messages=core.GUESTBOOK,
-        csrf_token=token,
-        state=core.XSS_S_STATE,
-        max_len=core.MAX_MSG_LEN,
-    )
+    return _render_guestbook(token)
 
 @web_bp.post("/guestbook")
 def guestbook_post():
@@ -55,17 +92,7 @@ def guestbook_post():
         core.log_attempt(user, True, "invalid", "csrf_bad", route=request.path)
         new_token = secrets.token_hex(32)
         session["csrf_token"] = new_token
-        return (
-            render_template(
-                "guestbook.html",
-                messages=core.GUESTBOOK,
-                csrf_token=new_token,
-                state=core.XSS_S_STATE,
-                error="Invalid session",
-                max_len=core.MAX_MSG_LEN,
-            ),
-            400,
-        )
+        return _render_guestbook(new_token, error="Invalid session", status=400)
 
     message = (request.form.get("message") or "").strip()
     if not message:
@@ -73,28 +100,12 @@ def guestbook_post():
         if not token:
             token = secrets.token_hex(32)
             session["csrf_token"] = token
-        return (
-            render_template(
-                "guestbook.html",
-                messages=core.GUESTBOOK,
-                csrf_token=token,
-                state=core.XSS_S_STATE,
-                error="Message required",
-                max_len=core.MAX_MSG_LEN,
-            ),
-            400,
-        )
+        return _render_guestbook(token, error="Message required", status=400)
 
     if len(message) > core.MAX_MSG_LEN:
         message = message[: core.MAX_MSG_LEN]
 
-    core.GUESTBOOK.append(
-        {
-            "ts": core.now_utc_iso(),
-            "user": user,
-            "message": message,
-        }
-    )
+    core.GUESTBOOK.append(core.now_utc_iso(), user, message)
     core.log_attempt(
         user,
         True,
@@ -0,0 +1,47 @@
+BEGIN;
+
+-- Trigger-maintained row counts for list endpoints.
+-- owner = '' holds the table-wide total; notes also keep one row per owner.
+CREATE TABLE IF NOT EXISTS row_counts (
+  tbl   TEXT    NOT NULL,
+  owner TEXT    NOT NULL DEFAULT '',
+  n     INTEGER NOT NULL,
+  PRIMARY KEY (tbl, owner)
+) WITHOUT ROWID;
+
+DELETE FROM row_counts WHERE tbl IN ('products', 'notes');
+INSERT INTO row_counts (tbl, owner, n) SELECT 'products', '', COUNT(*) FROM products;
+INSERT INTO row_counts (tbl, owner, n) SELECT 'notes', '', COUNT(*) FROM notes;
+INSERT INTO row_counts (tbl, owner, n) SELECT 'notes', owner, COUNT(*) FROM notes GROUP BY owner;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_count_ins AFTER INSERT ON products
+BEGIN
+  UPDATE row_counts SET n = n + 1 WHERE tbl = 'products' AND owner = '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_count_del AFTER DELETE ON products
+BEGIN
+  UPDATE row_counts SET n = n - 1 WHERE tbl = 'products' AND owner = '';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_count_ins AFTER INSERT ON notes
+BEGIN
+  UPDATE row_counts SET n = n + 1 WHERE tbl = 'notes' AND owner = '';
+  INSERT INTO row_counts (tbl, owner, n) VALUES ('notes', NEW.owner, 1)
+    ON CONFLICT (tbl, owner) DO UPDATE SET n = n + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_count_del AFTER DELETE ON notes
+BEGIN
+  UPDATE row_counts SET n = n - 1 WHERE tbl = 'notes' AND owner IN ('', OLD.owner);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_count_owner AFTER UPDATE OF owner ON notes
+WHEN OLD.owner <> NEW.owner
+BEGIN
+  UPDATE row_counts SET n = n - 1 WHERE tbl = 'notes' AND owner = OLD.owner;
+  INSERT INTO row_counts (tbl, owner, n) VALUES ('notes', NEW.owner, 1)
+    ON CONFLICT (tbl, owner) DO UPDATE SET n = n + 1;
+END;
+
+COMMIT;
@@ -0,0 +1,30 @@
+BEGIN;
+
+-- Trigram FTS5 shadow index over products.name for substring search.
+-- External-content table: stores only the index, rows stay in products.
+CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+  name,
+  content = 'products',
+  content_rowid = 'id',
+  tokenize = 'trigram'
+);
+
+INSERT INTO products_fts (products_fts) VALUES ('rebuild');
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_ins AFTER INSERT ON products
+BEGIN
+  INSERT INTO products_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_del AFTER DELETE ON products
+BEGIN
+  INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_fts_upd AFTER UPDATE OF name ON products
+BEGIN
+  INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', OLD.id, OLD.name);
+  INSERT INTO products_fts (rowid, name) VALUES (NEW.id, NEW.name);
+END;
+
+COMMIT;
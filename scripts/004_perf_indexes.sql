@@ -0,0 +1,10 @@
+BEGIN;
+
+-- Owner-scoped note lists: WHERE owner = ? ORDER BY title|id, id (seek + ordered scan, no temp B-tree).
+CREATE INDEX IF NOT EXISTS idx_notes_owner_title_id ON notes(owner, title, id);
+CREATE INDEX IF NOT EXISTS idx_notes_owner_id       ON notes(owner, id);
+
+-- Price range filters and sort_by=price: ORDER BY price, id.
+CREATE INDEX IF NOT EXISTS idx_products_price_id    ON products(price, id);
+
+COMMIT;
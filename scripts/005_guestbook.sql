@@ -0,0 +1,62 @@
+BEGIN;
+
+-- Durable guestbook (GUESTBOOK_STORE=sqlite, authlab/guestbook.py).
+-- seq orders messages by commit; ids are reserved in blocks from guestbook_ids.
+CREATE TABLE IF NOT EXISTS guestbook (
+  seq     INTEGER PRIMARY KEY,
+  id      INTEGER NOT NULL UNIQUE,
+  ts      TEXT    NOT NULL,
+  user    TEXT    NOT NULL,
+  message TEXT    NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS guestbook_ids (
+  k       INTEGER PRIMARY KEY CHECK (k = 0),
+  next_id INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO guestbook_ids (k, next_id) VALUES (0, 1);
+
+-- Per-table change counters for caches and ETags (core.db_table_version).
+-- PRAGMA data_version moves on any commit, including guestbook flushes;
+-- these only move when their own table changes. Seeded from the clock so a
+-- rebuilt database does not repeat old versions.
+CREATE TABLE IF NOT EXISTS table_versions (
+  tbl TEXT    PRIMARY KEY,
+  v   INTEGER NOT NULL
+) WITHOUT ROWID;
+
+INSERT OR IGNORE INTO table_versions (tbl, v)
+  VALUES ('products', CAST(strftime('%s', 'now') AS INTEGER) * 1000),
+         ('notes',    CAST(strftime('%s', 'now') AS INTEGER) * 1000);
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_ins AFTER INSERT ON products
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_upd AFTER UPDATE ON products
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_products_version_del AFTER DELETE ON products
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'products';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_version_ins AFTER INSERT ON notes
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'notes';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_version_upd AFTER UPDATE ON notes
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'notes';
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_notes_version_del AFTER DELETE ON notes
+BEGIN
+  UPDATE table_versions SET v = v + 1 WHERE tbl = 'notes';
+END;
+
+COMMIT;
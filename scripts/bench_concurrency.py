@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Thread-safety stress test and scaling benchmark for shared in-process state.
+Usage (from project root): python scripts/bench_concurrency.py [--threads 1,2,4,8,16,32] [--ops 2000]
+
+For each thread count, all threads run at once against one shared object:
+
+1) guestbook (memory): every thread appends --ops messages; ids must be
+   unique and contiguous, and the ring must hold exactly what was written.
+2) guestbook (sqlite): same against SqliteGuestbook on a throwaway DB;
+   after close() every id must be in the table exactly once.
+3) rate store, counts: every thread hits the same 8 keys with a budget
+   that never runs out; each key's stored count must equal its hits.
+4) rate store, limit: the same keys with a small budget; exactly
+   max_attempts hits per key must be allowed.
+
+The GIL switch interval is lowered (--switch-us) so threads interleave
+inside the critical sections far more often than under a real server.
+Prints ops/s per thread count; exits 1 on any duplicate or miscount.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import threading
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from authlab.guestbook import Guestbook, SqliteGuestbook  # noqa: E402
+from authlab.ratelimit import MemoryRateStore, fixed_window  # noqa: E402
+
+NOW = 1_000_000
+WINDOW = 3600
+KEYS = [f"shared:{i}" for i in range(8)]
+LIMIT = 37
+
+
+def run_threads(n, fn):
+    """Run fn(thread_no) in n threads released together; returns (results, seconds)."""
+    results = [None] * n
+    barrier = threading.Barrier(n + 1)
+
+    def worker(i):
+        barrier.wait()
+        results[i] = fn(i)
+
+    ts = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in ts:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in ts:
+        t.join()
+    return results, time.perf_counter() - t0
+
+
+def check_guestbook(n, ops):
+    gb = Guestbook(capacity=n * ops)
+    results, dt = run_threads(
+        n, lambda i: [gb.append("ts", f"u{i}", f"m{j}").id for j in range(ops)]
+    )
+    ids = [x for r in results for x in r]
+    total = n * ops
+    ok = (
+        len(set(ids)) == total
+        and sorted(ids) == list(range(1, total + 1))
+        and len(gb) == total
+        and gb.next_id == total + 1
+        and [m.id for m in gb.newest(total)] == list(range(total, 0, -1))
+    )
+    return ok, total / dt
+
+
+def guestbook_db(path):
+    """Throwaway DB with the guestbook schema (005 also versions products/notes)."""
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE products (id INTEGER PRIMARY KEY);
+        CREATE TABLE notes (id INTEGER PRIMARY KEY);
+    """)
+    conn.executescript((BASE_DIR / "scripts" / "005_guestbook.sql").read_text(encoding="utf-8"))
+    conn.close()
+
+
+def check_sqlite_guestbook(n, ops, tmp):
+    path = os.path.join(tmp, f"gb_{n}.db")
+    guestbook_db(path)
+    gb = SqliteGuestbook(path, capacity=1000, flush_ms=2)
+    results, dt = run_threads(
+        n, lambda i: [gb.append("ts", f"u{i}", f"m{j}").id for j in range(ops)]
+    )
+    gb.close()
+    ids = [x for r in results for x in r]
+    total = n * ops
+    conn = sqlite3.connect(path)
+    rows, distinct = conn.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM guestbook;").fetchone()
+    stored = {r[0] for r in conn.execute("SELECT id FROM guestbook;")}
+    conn.close()
+    ok = len(set(ids)) == total and rows == distinct == total and stored == set(ids)
+    return ok, total / dt
+
+
+def check_rate_counts(n, ops):
+    store = MemoryRateStore()
+    budget = n * ops + 1
+
+    def fn(i):
+        for j in range(ops):
+            store.hit(KEYS[(i + j) % len(KEYS)], NOW, fixed_window(NOW, WINDOW, budget))
+
+    _, dt = run_threads(n, fn)
+    expected = {k: 0 for k in KEYS}
+    for i in range(n):
+        for j in range(ops):
+            expected[KEYS[(i + j) % len(KEYS)]] += 1
+    ok = all(store.get(k, NOW)[1] == expected[k] for k in KEYS)
+    return ok, n * ops / dt
+
+
+def check_rate_limit(n, ops):
+    store = MemoryRateStore()
+
+    def fn(i):
+        allowed = dict.fromkeys(KEYS, 0)
+        for j in range(ops):
+            k = KEYS[(i + j) % len(KEYS)]
+            allowed[k] += store.hit(k, NOW, fixed_window(NOW, WINDOW, LIMIT))[0]
+        return allowed
+
+    results, dt = run_threads(n, fn)
+    # Keys that saw fewer than LIMIT attempts in total must allow all of them.
+    attempts = dict.fromkeys(KEYS, 0)
+    for i in range(n):
+        for j in range(ops):
+            attempts[KEYS[(i + j) % len(KEYS)]] += 1
+    ok = all(sum(r[k] for r in results) == min(LIMIT, attempts[k]) for k in KEYS)
+    return ok, n * ops / dt
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", default="1,2,4,8,16,32")
+    parser.add_argument("--ops", type=int, default=2000, help="operations per thread")
+    parser.add_argument("--switch-us", type=float, default=5.0,
+                        help="GIL switch interval in microseconds (Python default: 5000)")
+    args = parser.parse_args()
+    counts = [int(x) for x in args.threads.split(",")]
+    sys.setswitchinterval(args.switch_us / 1e6)
+
+    checks = [
+        ("guestbook mem", lambda n, tmp: check_guestbook(n, args.ops)),
+        ("guestbook sql", lambda n, tmp: check_sqlite_guestbook(n, args.ops, tmp)),
+        ("rate counts", lambda n, tmp: check_rate_counts(n, args.ops)),
+        ("rate limit", lambda n, tmp: check_rate_limit(n, args.ops)),
+    ]
+    print(f"{args.ops} ops/thread, switch interval {args.switch_us:g} us (ops/s, all threads)")
+    print(f"{'threads':>7} " + " ".join(f"{label:>15}" for label, _ in checks))
+    failed = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in counts:
+            cells = []
+            for label, check in checks:
+                ok, rate = check(n, tmp)
+                cells.append(f"{rate:13,.0f}{'  ' if ok else ' !'}")
+                if not ok:
+                    failed.append((label, n))
+            print(f"{n:7d} " + " ".join(cells))
+    if failed:
+        print("FAIL (duplicate ids or miscounts): "
+              + ", ".join(f"{label} @ {n} threads" for label, n in failed))
+        sys.exit(1)
+    print("OK: no duplicate ids, no lost or extra counts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Connection strategy benchmark for the DB-backed API handlers.
+Usage (from project root): python scripts/bench_db.py [--requests 5000]
+
+before: sqlite3.connect() per request (the old handler pattern)
+after:  core.db_conn(readonly=True) pooled per-thread connection
+Both run the /api/v1/products list pair (COUNT + page) and the
+/api/v1/notes/<id> lookup against DB_PATH; prints requests/sec.
+"""
+
+import sys
+import time
+import sqlite3
+import argparse
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from authlab import core  # noqa: E402
+
+PRODUCTS_COUNT = "SELECT COUNT(*) AS c FROM products WHERE name LIKE ? COLLATE NOCASE;"
+PRODUCTS_PAGE = (
+    "SELECT id, name, price FROM products WHERE name LIKE ? COLLATE NOCASE "
+    "ORDER BY name ASC, id ASC LIMIT 20 OFFSET 0;"
+)
+NOTE_DETAIL = "SELECT id, title, body FROM notes WHERE id = ? AND owner = ? LIMIT 1;"
+
+
+def workload(conn, i):
+    cur = conn.cursor()
+    cur.execute(PRODUCTS_COUNT, ("%lap%",))
+    cur.fetchone()
+    cur.execute(PRODUCTS_PAGE, ("%lap%",))
+    cur.fetchall()
+    cur.execute(NOTE_DETAIL, (1 + i % 3, "admin"))
+    cur.fetchone()
+
+
+def before(n):
+    for i in range(n):
+        with sqlite3.connect(core.DB_PATH) as conn:
+            conn.row_factory = sqlite3.Row
+            workload(conn, i)
+        conn.close()
+
+
+def after(n):
+    for i in range(n):
+        workload(core.db_conn(readonly=True), i)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+    if not Path(core.DB_PATH).exists():
+        sys.exit(f"{core.DB_PATH} not found - run scripts/db_init.py first")
+
+    print(f"DB_PATH={core.DB_PATH}")
+    for name, fn in (("before (connect per request)", before), ("after  (pooled, WAL, ro)", after)):
+        fn(50)  # warm-up
+        t0 = time.perf_counter()
+        fn(args.requests)
+        dt = time.perf_counter() - t0
+        print(f"{name}: {args.requests / dt:10,.0f} req/s  {1e6 * dt / args.requests:8.1f} us/req")
+
+
+if __name__ == "__main__":
+    main()
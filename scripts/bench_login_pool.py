@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Login burst vs cheap requests: inline scrypt vs the bounded verifier pool.
+Usage (from project root): python scripts/bench_login_pool.py [--attackers 16] [--seconds 5]
+
+--attackers threads submit wrong passwords back to back (a credential
+stuffing burst on a threaded server) while one probe thread serves a
+cheap request every 10 ms: encoding a 20-item products page, about what
+GET /api/v1/products costs on a cache hit, and is timed from when it was
+due (so waiting for a CPU or the GIL counts). Two setups are compared:
+
+- inline: PasswordVerifier(workers=0) with no admission cap, i.e. the
+  old check_password_hash call on every request thread;
+- pool:   PasswordVerifier(--workers, --max-inflight); burst requests
+  beyond the cap get VerifierBusy (503 + Retry-After in /login).
+
+Prints probe latency percentiles, verified/rejected counts and the
+verifier's own queue depth and hash latency report.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+from authlab.pwverify import PasswordVerifier, VerifierBusy  # noqa: E402
+
+PAGE = [{"id": i, "name": f"Product {i}", "price": 9.99 + i} for i in range(20)]
+
+
+def probe(stop, samples):
+    """Latency from each request's scheduled arrival (every 10 ms) to its response."""
+    due = time.perf_counter()
+    while not stop.is_set():
+        due += 0.01
+        time.sleep(max(0.0, due - time.perf_counter()))
+        json.dumps({"items": PAGE, "count": len(PAGE), "total": 1000})
+        samples.append(time.perf_counter() - due)
+
+
+def attacker(verifier, pwhash, stop, counts):
+    while not stop.is_set():
+        try:
+            verifier.verify(pwhash, "wrong-password")
+            counts["verified"] += 1
+        except VerifierBusy:
+            counts["rejected"] += 1
+            time.sleep(0.005)   # the 503 round trip, not a real Retry-After wait
+
+
+def run(label, verifier, pwhash, attackers, seconds):
+    if verifier.workers:
+        verifier.verify(pwhash, "warm-up")   # start the pool outside the timing
+    stop = threading.Event()
+    samples, counts = [], {"verified": 0, "rejected": 0}
+    threads = [threading.Thread(target=probe, args=(stop, samples))]
+    threads += [
+        threading.Thread(target=attacker, args=(verifier, pwhash, stop, counts))
+        for _ in range(attackers)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    q = statistics.quantiles(samples, n=100) if len(samples) > 1 else samples * 99
+    print(
+        f"{label:7} probe p50 {1e3 * q[49]:7.2f} ms  p99 {1e3 * q[98]:7.2f} ms  "
+        f"({len(samples)} probes)  logins verified {counts['verified']}, "
+        f"rejected {counts['rejected']}"
+    )
+    print(f"        verifier: {verifier.info()}")
+    verifier.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attackers", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--max-inflight", type=int, default=0, help="default 4 x workers")
+    args = parser.parse_args()
+
+    pwhash = generate_password_hash("correct horse")
+    print(f"{args.attackers} login threads for {args.seconds:g}s each, {os.cpu_count()} CPUs")
+    run("inline", PasswordVerifier(0, max_inflight=args.attackers), pwhash,
+        args.attackers, args.seconds)
+    run("pool", PasswordVerifier(args.workers, args.max_inflight or 4 * args.workers),
+        pwhash, args.attackers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
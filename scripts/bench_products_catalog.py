@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+/api/v1/products engine benchmark: SQLite path vs in-process columnar catalog.
+Usage (from project root): python scripts/bench_products_catalog.py [--rows 100000] [--runs 20]
+
+Builds a throwaway DB with --rows synthetic products (same generator and
+migrations as bench_products_search.py), then answers a mix of list
+requests (price ranges, name search, sorts, offset and cursor pages) with
+the handler's SQL page function and with ProductCatalog. Results must be
+identical. COUNT_MODE=exact so the SQL side really counts every time.
+Prints the catalog load time and median latency per request.
+"""
+
+import os
+import sys
+import time
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("COUNT_MODE", "exact")
+
+from authlab import core  # noqa: E402
+from authlab.catalog import ProductCatalog, np  # noqa: E402
+from authlab.api.products_api import SORT_COLS, _sql_page  # noqa: E402
+from bench_products_search import build  # noqa: E402
+
+# (label, q, min_price, max_price, sort_by, sort_dir, offset)
+REQUESTS = [
+    ("first page", "", None, None, "name", "asc", 0),
+    ("deep offset", "", None, None, "price", "desc", 5000),
+    ("price range", "", 100.0, 250.0, "price", "asc", 0),
+    ("search lap", "lap", None, None, "name", "asc", 0),
+    ("search+range", "studio", 500.0, 1500.0, "price", "desc", 0),
+    ("rare search", "pro 123", None, None, "id", "desc", 0),
+    ("no match", "zzq", None, None, "name", "asc", 0),
+]
+LIMIT = 20
+
+
+def sql_query(conn, q, lo, hi, sort_by, sort_dir, offset, after=None):
+    return _sql_page(
+        conn, q, lo, hi, SORT_COLS[sort_by], core.SORT_DIRS[sort_dir], LIMIT, offset, after
+    )
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = str(Path(d) / "bench.db")
+        build(path, args.rows)
+        conn = sqlite3.connect(path)
+        conn.row_factory = sqlite3.Row
+
+        catalog = ProductCatalog()
+        t0 = time.perf_counter()
+        catalog.refresh(conn, 1)
+        print(
+            f"{args.rows:,} products, catalog loaded in {1e3 * (time.perf_counter() - t0):.0f} ms "
+            f"({'numpy' if catalog.use_numpy else 'pure Python'}; numpy "
+            f"{'available' if np is not None else 'not installed'})"
+        )
+
+        print(f"{'request':14} {'total':>8} {'SQL ms':>9} {'catalog ms':>11} {'speedup':>8}")
+        ok = True
+        for label, q, lo, hi, sort_by, sort_dir, offset in REQUESTS:
+            sql_res, sql_t = timed(
+                lambda: sql_query(conn, q, lo, hi, sort_by, sort_dir, offset), args.runs
+            )
+            cat_res, cat_t = timed(
+                lambda: catalog.query(q, lo, hi, sort_by, sort_dir, LIMIT, offset), args.runs
+            )
+            same = sql_res == cat_res
+
+            # Follow the cursor to the second page on both engines as well.
+            items = sql_res[0]
+            if items and sql_res[2]:
+                after = (items[-1][SORT_COLS[sort_by]], items[-1]["id"])
+                same &= sql_query(conn, q, lo, hi, sort_by, sort_dir, 0, after)[0] == catalog.query(
+                    q, lo, hi, sort_by, sort_dir, LIMIT, after=after
+                )[0]
+            ok &= same
+            print(
+                f"{label:14} {sql_res[1]:8,d} {1e3 * sql_t:9.2f} {1e3 * cat_t:11.2f} "
+                f"{sql_t / cat_t:7.1f}x{'' if same else '  MISMATCH'}"
+            )
+        conn.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Product name search benchmark: LIKE scan vs FTS5 trigram prefilter.
+Usage (from project root): python scripts/bench_products_search.py [--rows 1000000] [--runs 5]
+
+Builds a throwaway DB with --rows synthetic products, applies the
+numbered migrations (NOCASE index, row counters, FTS5 trigram index) and
+runs the /api/v1/products search pair (COUNT + first page) both ways.
+Results must be identical; prints median latency per query.
+"""
+
+import sys
+import time
+import random
+import sqlite3
+import argparse
+import tempfile
+import statistics
+from pathlib import Path
+
+SQL_DIR = Path(__file__).resolve().parent
+
+BRANDS = ["Laptop", "Phone", "Router", "Monitor", "Keyboard", "Tablet", "Camera", "Speaker"]
+LINES = ["Go", "Air", "Lite", "Pro", "Work", "Flex", "Gamer", "Studio", "Ultra", "Neo", "Edge", "Max", "Mini"]
+QUERIES = ["lap", "studio 15", "ultra", "pro 123", "Édge", "zzq"]
+
+LIKE_WHERE = " WHERE name LIKE ? COLLATE NOCASE"
+FTS_WHERE = (
+    " WHERE id IN (SELECT rowid FROM products_fts WHERE products_fts MATCH ?)"
+    " AND name LIKE ? COLLATE NOCASE"
+)
+
+
+def build(path, rows):
+    rnd = random.Random(42)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=OFF;")
+    conn.execute("PRAGMA synchronous=OFF;")
+    conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT NOT NULL, price REAL NOT NULL);")
+    conn.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, title TEXT NOT NULL, body TEXT NOT NULL, owner TEXT NOT NULL);")
+    batch = []
+    for _ in range(rows):
+        name = f"{rnd.choice(BRANDS)} {rnd.choice(LINES)} {rnd.randint(1, 99999)}"
+        batch.append((name, round(rnd.uniform(10, 3000), 2)))
+        if len(batch) == 50_000:
+            conn.executemany("INSERT INTO products (name, price) VALUES (?, ?);", batch)
+            batch.clear()
+    conn.executemany("INSERT INTO products (name, price) VALUES (?, ?);", batch)
+    conn.commit()
+    for sql_file in sorted(SQL_DIR.glob("[0-9][0-9][0-9]_*.sql")):
+        conn.executescript(sql_file.read_text(encoding="utf-8"))
+    conn.close()
+
+
+def run(conn, where, params):
+    count = conn.execute(f"SELECT COUNT(*) FROM products{where};", params).fetchone()[0]
+    page = conn.execute(
+        f"SELECT id, name, price FROM products{where} ORDER BY name ASC, id ASC LIMIT 20;",
+        params,
+    ).fetchall()
+    return count, page
+
+
+def timed(conn, where, params, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        result = run(conn, where, params)
+        samples.append(time.perf_counter() - t0)
+    return result, statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        path = str(Path(d) / "bench.db")
+        t0 = time.perf_counter()
+        build(path, args.rows)
+        print(f"built {args.rows:,} products + indexes in {time.perf_counter() - t0:.1f}s")
+
+        conn = sqlite3.connect(path)
+        print(f"{'q':12} {'matches':>9} {'LIKE ms':>9} {'FTS ms':>9} {'speedup':>8}")
+        ok = True
+        for q in QUERIES:
+            pattern = f"%{q}%"
+            like_res, like_t = timed(conn, LIKE_WHERE, (pattern,), args.runs)
+            phrase = '"' + q.replace('"', '""') + '"'
+            fts_res, fts_t = timed(conn, FTS_WHERE, (phrase, pattern), args.runs)
+            same = like_res == fts_res
+            ok &= same
+            print(
+                f"{q:12} {like_res[0]:9,d} {1e3 * like_t:9.1f} {1e3 * fts_t:9.1f} "
+                f"{like_t / fts_t:7.1f}x{'' if same else '  MISMATCH'}"
+            )
+        conn.close()
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
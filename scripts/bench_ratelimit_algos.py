@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare rate-limit algorithms on the in-process store.
+Usage (from project root): python scripts/bench_ratelimit_algos.py [--keys 100000] [--hits 200000]
+
+For each algorithm (fixed = current default, sliding, gcra) reports:
+- memory per key (tracemalloc, store filled with --keys distinct keys),
+- checks/sec over --hits checks spread across 1000 hot keys,
+- requests let through by a burst straddling a window boundary
+  (limit 10 per 10 s: 1 request at t=0, 9 at t=9.9 s, 10 more at t=10.1 s).
+"""
+
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from authlab.ratelimit import ALGORITHMS, MemoryRateStore  # noqa: E402
+
+WINDOW = 60
+LIMIT = 5
+
+
+def memory_per_key(algo, keys):
+    make = ALGORITHMS[algo]
+    tracemalloc.start()
+    store = MemoryRateStore(max_entries=keys + 1)
+    base = tracemalloc.get_traced_memory()[0]
+    now = 1_000
+    for i in range(keys):
+        store.hit(f"api:10.0.{i % 256}.{i // 256}|user{i}", now, make(now, WINDOW, LIMIT))
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    return used / keys
+
+
+def checks_per_sec(algo, hits):
+    make = ALGORITHMS[algo]
+    store = MemoryRateStore()
+    keys = [f"api:k{i}" for i in range(1000)]
+    t0 = time.perf_counter()
+    for i in range(hits):
+        now = 1_000 + i * 1e-4
+        store.hit(keys[i % 1000], now, make(now, WINDOW, LIMIT))
+    return hits / (time.perf_counter() - t0)
+
+
+def boundary_burst(algo):
+    make = ALGORITHMS[algo]
+    store = MemoryRateStore()
+    allowed = 0
+    for now in [0.0] + [9.9] * 9 + [10.1] * 10:
+        ok, _ = store.hit("k", now, make(now, 10, 10))
+        allowed += ok
+    return allowed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--hits", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'algo':8} {'bytes/key':>10} {'checks/s':>12} {'burst@edge (limit 10)':>22}")
+    for algo in ALGORITHMS:
+        print(
+            f"{algo:8} {memory_per_key(algo, args.keys):10.0f} "
+            f"{checks_per_sec(algo, args.hits):12,.0f} {boundary_burst(algo):22d}"
+        )
+
+
+if __name__ == "__main__":
+    main()
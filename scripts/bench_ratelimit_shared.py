@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Multi-process correctness and throughput check for the shared rate-limit store.
+Usage (from project root): python scripts/bench_ratelimit_shared.py [--procs 8] [--hits 5000]
+
+1) Correctness: all processes hammer the same keys; the number of allowed
+   hits per key must equal max_attempts exactly (no lost or double counts).
+2) Throughput: every process hits its own keys; reports checks/sec and
+   mean latency per check, next to the in-process MemoryRateStore.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing as mp
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from authlab.ratelimit import MemoryRateStore, SqliteRateStore, fixed_window  # noqa: E402
+
+NOW = 1_000_000
+WINDOW = 3600
+
+
+def _contend(path, keys, attempts, max_attempts, out):
+    store = SqliteRateStore(path)
+    allowed = {k: 0 for k in keys}
+    for i in range(attempts):
+        k = keys[i % len(keys)]
+        ok, _ = store.hit(k, NOW, fixed_window(NOW, WINDOW, max_attempts))
+        allowed[k] += ok
+    out.put(allowed)
+
+
+def _throughput(path, n, pid, out):
+    store = SqliteRateStore(path)
+    step_max = n + 1
+    t0 = time.perf_counter()
+    for i in range(n):
+        store.hit(f"p{pid}:{i % 1000}", NOW, fixed_window(NOW, WINDOW, step_max))
+    out.put(time.perf_counter() - t0)
+
+
+def run(procs, hits, path):
+    ctx = mp.get_context("spawn")
+
+    # 1) correctness under contention
+    keys = [f"shared:{i}" for i in range(10)]
+    max_attempts = 37
+    out = ctx.Queue()
+    ps = [ctx.Process(target=_contend, args=(path, keys, hits // 10, max_attempts, out))
+          for _ in range(procs)]
+    for p in ps:
+        p.start()
+    totals = {k: 0 for k in keys}
+    for _ in ps:
+        for k, v in out.get().items():
+            totals[k] += v
+    for p in ps:
+        p.join()
+    bad = {k: v for k, v in totals.items() if v != max_attempts}
+    print(f"correctness: {procs} procs x {hits // 10} attempts on {len(keys)} keys, "
+          f"max_attempts={max_attempts} -> {'OK' if not bad else f'FAIL {bad}'}")
+
+    # 2) throughput
+    out = ctx.Queue()
+    ps = [ctx.Process(target=_throughput, args=(path, hits, i, out)) for i in range(procs)]
+    t0 = time.perf_counter()
+    for p in ps:
+        p.start()
+    per_proc = [out.get() for _ in ps]
+    for p in ps:
+        p.join()
+    wall = time.perf_counter() - t0
+    total = procs * hits
+    print(f"sqlite  : {procs} procs, {total} checks, {total / wall:,.0f} checks/s aggregate, "
+          f"{1e6 * sum(per_proc) / total:.1f} us/check per process")
+
+    mem = MemoryRateStore()
+    t0 = time.perf_counter()
+    for i in range(hits):
+        mem.hit(f"m:{i % 1000}", NOW, fixed_window(NOW, WINDOW, hits + 1))
+    dt = time.perf_counter() - t0
+    print(f"memory  : 1 proc, {hits} checks, {hits / dt:,.0f} checks/s, {1e6 * dt / hits:.2f} us/check")
+    return 0 if not bad else 1
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--procs", type=int, default=8)
+    parser.add_argument("--hits", type=int, default=5000)
+    args = parser.parse_args()
+    shm = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    with tempfile.TemporaryDirectory(dir=shm) as d:
+        sys.exit(run(args.procs, args.hits, os.path.join(d, "rate.db")))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,11 +2,24 @@
 """
 Recreate and seed authlab.db for all demos.
 Usage (from project root): python scripts/db_init.py
+       python scripts/db_init.py --products 1000000 --notes 2000000 --owners 500 --seed 7
+
+Without options the fixed demo dataset below is written. --products and
+--notes give total row counts: the demo rows keep their ids and owners,
+and the rest is synthetic data, deterministic for a given --seed. Bulk
+loads run in one transaction with batched executemany() and bulk-load
+pragmas; indexes, counters and FTS are built afterwards by the migrations.
 """
 
+import time
+import random
 import sqlite3
+import argparse
+from itertools import islice
 from pathlib import Path
 
+from migrate import migrate
+
 BASE_DIR = Path(__file__).resolve().parent.parent
 DB_PATH = BASE_DIR / "authlab.db"
 SQL_DIR = BASE_DIR / "scripts"
@@ -35,15 +48,96 @@ NOTES = [
     ("Alice note #3", "Seeded note 3 for alice", "alice"),
 ]
 
-def main():
-    # 0) fresh start
-    if DB_PATH.exists():
-        DB_PATH.unlink()
+BATCH = 50_000
+
+BRANDS = {
+    # brand: (lines, base price)
+    "Laptop":   (["Go", "Air", "Lite", "Pro", "Work", "Flex", "Gamer", "Studio", "Ultra", "Neo", "Edge"], 1000.0),
+    "Phone":    (["Max", "Mini", "Plus", "Lite", "Pro", "Fold"], 650.0),
+    "Tablet":   (["Air", "Pro", "Mini", "Kids"], 450.0),
+    "Router":   (["AX1800", "AX3000", "AX5400", "BE7200", "Mesh"], 150.0),
+    "Monitor":  (['24"', '27"', '32"', "Ultrawide 34", "OLED 27"], 300.0),
+    "Keyboard": (["Mech", "Low Profile", "TKL", "Wireless", "Ergo"], 90.0),
+    "Mouse":    (["Wireless", "Gamer", "Ergo", "Travel"], 45.0),
+    "Headset":  (["Studio", "Gamer", "Wireless", "ANC"], 180.0),
+    "Camera":   (["Mirrorless", "Action", "Compact", "Webcam 4K"], 700.0),
+    "Speaker":  (["Mini", "Soundbar", "Party", "Smart"], 120.0),
+}
+TOPICS = ["Meeting", "Todo", "Idea", "Bug", "Invoice", "Trip", "Recipe", "Reading", "Release", "Password hint"]
+WORDS = (
+    "alpha beta review deploy budget call follow up draft final client server cache index query "
+    "report plan weekly sprint ticket backup restore audit token session login export import"
+).split()
+
+
+def synthetic_products(rnd, n):
+    """n (name, price) rows; price is lognormal around the brand's base."""
+    brands = list(BRANDS.items())
+    for _ in range(n):
+        brand, (lines, base) = rnd.choice(brands)
+        name = f"{brand} {rnd.choice(lines)} {rnd.randint(1, 9999)}"
+        yield name, round(base * rnd.lognormvariate(0, 0.35), 2)
+
+
+def owner_names(n):
+    """admin and alice (demo users) plus synthetic owners, n in total."""
+    return ["admin", "alice"] + [f"user{k:05d}" for k in range(1, max(2, n) - 1)]
+
+
+def synthetic_notes(rnd, n, owners):
+    """n (title, body, owner) rows; owners follow a Zipf-like skew."""
+    cum, total = [], 0.0
+    for rank in range(1, len(owners) + 1):
+        total += 1.0 / rank
+        cum.append(total)
+    for i in range(n):
+        owner = rnd.choices(owners, cum_weights=cum)[0]
+        title = f"{rnd.choice(TOPICS)} #{i + 1}"
+        body = " ".join(rnd.choices(WORDS, k=rnd.randint(4, 24)))
+        yield title, body, owner
+
+
+def insert_batched(cur, sql, rows):
+    while True:
+        batch = list(islice(rows, BATCH))
+        if not batch:
+            break
+        cur.executemany(sql, batch)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, help="total products (default: demo set only)")
+    parser.add_argument("--notes", type=int, help="total notes (default: demo set only)")
+    parser.add_argument("--owners", type=int, default=2, help="note owners incl. admin/alice (default 2)")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for synthetic rows (default 1)")
+    parser.add_argument("--db", default=str(DB_PATH), help="database file (default: authlab.db)")
+    return parser.parse_args()
+
 
-    conn = sqlite3.connect(DB_PATH.as_posix())
+def main():
+    args = parse_args()
+    db_path = Path(args.db)
+    rnd = random.Random(args.seed)
+    extra_products = max(0, (args.products or 0) - len(PRODUCTS))
+    extra_notes = max(0, (args.notes or 0) - len(NOTES))
+    t0 = time.perf_counter()
+
+    # 0) fresh start (with any WAL/shm left over from a running app)
+    for path in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+        if path.exists():
+            path.unlink()
+
+    conn = sqlite3.connect(db_path.as_posix())
     conn.row_factory = sqlite3.Row
     cur = conn.cursor()
 
+    # Bulk-load pragmas: no rollback journal or fsync while the fresh file is filled.
+    cur.execute("PRAGMA journal_mode=OFF;")
+    cur.execute("PRAGMA synchronous=OFF;")
+    cur.execute("PRAGMA temp_store=MEMORY;")
+    cur.execute("PRAGMA cache_size=-262144;")
+
     # 1) tables
     cur.execute("""
         CREATE TABLE products (
@@ -61,17 +155,25 @@ def main():
         );
     """)
 
-    # 2) seed
+    # 2) seed: demo rows first (stable ids), then synthetic rows, one transaction
     cur.executemany("INSERT INTO products (name, price) VALUES (?,?)", PRODUCTS)
     cur.executemany("INSERT INTO notes (title, body, owner) VALUES (?,?,?)", NOTES)
-
-    # 3) apply NOCASE index via migration script
-    idx_file = SQL_DIR / "001_products_nocase_index.sql"
-    if idx_file.exists():
-        cur.executescript(idx_file.read_text(encoding="utf-8"))
+    insert_batched(
+        cur, "INSERT INTO products (name, price) VALUES (?,?)",
+        synthetic_products(rnd, extra_products),
+    )
+    insert_batched(
+        cur, "INSERT INTO notes (title, body, owner) VALUES (?,?,?)",
+        synthetic_notes(rnd, extra_notes, owner_names(args.owners)),
+    )
 
     conn.commit()
 
+    # 3) indexes, counters and FTS via the versioned migration runner (after the load)
+    applied = migrate(conn, SQL_DIR)
+    cur.execute("PRAGMA journal_mode=DELETE;")
+    cur.execute("PRAGMA synchronous=FULL;")
+
     # 4) mini-summary
     cur.execute("SELECT COUNT(*) AS c FROM products;")
     pc = cur.fetchone()["c"]
@@ -84,9 +186,13 @@ def main():
 
     conn.close()
 
-    print("authlab.db recreated")
-    print(f"products: {pc} rows (NOCASE index applied)")
+    print(f"{db_path.name} recreated")
+    if extra_products or extra_notes:
+        print(f"synthetic: seed={args.seed}, owners={len(owner_names(args.owners))}, "
+              f"{time.perf_counter() - t0:.1f}s")
+    print(f"products: {pc} rows")
     print(f"notes: {nc} rows (admin={ac}, alice={bc})")
+    print("migrations: " + ", ".join(f"{v:03d}_{n}" for v, n in applied))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Query authlab.log across sealed segments.
+Usage (from project root): python scripts/logs_query.py query --since 1h --route /login --reason csrf_bad
+
+Loads authlab/logs.py on its own (not through the authlab package), so no
+app secrets are needed and no app state (DB pool, rate store, password
+verifier) is set up just to read log files.
+"""
+
+import sys
+import importlib.util
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+spec = importlib.util.spec_from_file_location("authlab_logs", BASE_DIR / "authlab" / "logs.py")
+logs = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(logs)
+
+
+if __name__ == "__main__":
+    sys.exit(logs.main(prog="scripts/logs_query.py"))
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Apply numbered SQL migrations to authlab.db in place.
+Usage (from project root): python scripts/migrate.py [--db PATH] [--list]
+
+Migrations are scripts/NNN_<name>.sql, applied in NNN order. Applied
+versions are recorded in the schema_migrations table, so re-running only
+applies new files. Each file manages its own BEGIN/COMMIT and must be
+idempotent (IF NOT EXISTS, rebuild/backfill), so a crash between a
+file's COMMIT and its version record is repaired by simply re-running.
+"""
+
+import re
+import sqlite3
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DB_PATH = BASE_DIR / "authlab.db"
+SQL_DIR = BASE_DIR / "scripts"
+
+_NAME_RE = re.compile(r"^(\d{3})_(.+)\.sql$")
+
+
+def available(sql_dir=SQL_DIR):
+    """Return [(version, name, path)] for every migration file, in order."""
+    found = []
+    for path in sql_dir.glob("[0-9][0-9][0-9]_*.sql"):
+        m = _NAME_RE.match(path.name)
+        if m:
+            found.append((int(m.group(1)), m.group(2), path))
+    return sorted(found)
+
+
+def applied(conn):
+    """Return {version: applied_at} from schema_migrations (created if missing)."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version    INTEGER PRIMARY KEY,
+            name       TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        );
+    """)
+    conn.commit()
+    return dict(conn.execute("SELECT version, applied_at FROM schema_migrations;").fetchall())
+
+
+def migrate(conn, sql_dir=SQL_DIR):
+    """Apply pending migrations; return the list of (version, name) applied."""
+    done = applied(conn)
+    ran = []
+    for version, name, path in available(sql_dir):
+        if version in done:
+            continue
+        try:
+            conn.executescript(path.read_text(encoding="utf-8"))
+            conn.execute(
+                "INSERT INTO schema_migrations (version, name, applied_at) VALUES (?,?,?);",
+                (version, name, datetime.utcnow().isoformat() + "Z"),
+            )
+            conn.commit()
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        ran.append((version, name))
+    return ran
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--db", default=str(DB_PATH), help="database file (default: authlab.db)")
+    parser.add_argument("--list", action="store_true", help="show status without applying")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    if args.list:
+        done = applied(conn)
+        for version, name, _ in available():
+            print(f"{version:03d} {name:32} {done.get(version, 'pending')}")
+        conn.close()
+        return
+
+    ran = migrate(conn)
+    conn.close()
+    if not ran:
+        print("up to date")
+    for version, name in ran:
+        print(f"applied {version:03d}_{name}")
+
+
+if __name__ == "__main__":
+    main()